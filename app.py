@@ -1,19 +1,26 @@
 import base64
+import collections
+import contextlib
 import datetime
 import glob
+import hashlib
 import html
+import itertools
 import json
+import math
 import os
+import queue
 import re
 import shutil
 import sys
 import urllib.parse
-import bs4
-from curl_cffi import requests as curl_requests
+from typing import Iterable, Optional
 import subprocess
 import configparser
+import asyncio
 import concurrent.futures
 import threading
+import time
 
 from rich.console import Console, Group
 from rich.live import Live
@@ -25,36 +32,82 @@ from rich.text import Text
 # Force all subprocesses to use UTF-8, which prevents the 'charmap' codec errors
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 
+from curl_cffi.requests.exceptions import RequestException
 from yt_dlp import YoutubeDL
+from concurrency import AdaptiveLimit, Slot
 from database import Database
+import direct_download
+from file_index import FileIndex
+from http_client import ClientPool
+from journal import CrawlJournal
+from media_index import MediaIndex
+from metrics import THROUGHPUT_BUCKETS, Metrics, MetricsFileWriter, MetricsServer
+from page_cache import PageCache
+from parsers import Card, get_parser
+from post_filter import PostFilter, parse_date
+from profiling import StageTimer, ThreadProfiler
+from rate_limit import BandwidthLimiter, RetryPolicy, parse_schedule
 
 # --- Globals ---
 config = configparser.ConfigParser(allow_no_value=True)
-scraper = curl_requests.Session(impersonate="chrome")
+http_pool: ClientPool = None  # See get_http_pool
 
-user_hash = ""
-poster_id = ""
-
-current_offset = 0
-offset_lock = threading.Lock()
-
-stop_event = threading.Event()
 print_lock = threading.Lock()
+
+# Media pipeline: page workers produce posts into these bounded queues, one pool per media type consumes them
+media_queues: dict[str, queue.Queue] = {}
+media_executors: dict[str, tuple[concurrent.futures.ThreadPoolExecutor, int]] = {}
+gallery_executor: concurrent.futures.ThreadPoolExecutor = None
+abort_event = threading.Event()  # Set on Ctrl-C; media workers drain their queues without processing
+# Video post-processing (ffmpeg) pool fed by the video downloaders; None runs it on the downloading thread
+postprocess_executor: concurrent.futures.ThreadPoolExecutor = None
+postprocess_slots: threading.BoundedSemaphore = None  # Bounds the videos handed off but not yet processed
+# Download bandwidth cap shared by photos and videos (None when unlimited, see start_bandwidth_limit)
+bandwidth_limiter: BandwidthLimiter = None
+
+# Page response cache (None when disabled) and --replay: pages come only from the cache, no downloads
+page_cache: PageCache = None
+replay_mode = False
+
+# Adaptive concurrency per request class ('page', 'fragments'), empty when disabled (see start_adaptive_limits)
+adaptive_limits: dict[str, AdaptiveLimit] = {}
 # --- End Globals ---
 
 
 class ProgressTracker:
-    """Thread-safe progress tracker with rich Live display."""
+    """
+    Thread-safe progress tracker with rich Live display.
+
+    Updates only touch counters and the activity dict; the display is built by Live's own
+    refresh thread (refresh_per_second times a second) from a snapshot of that state, so
+    worker threads never render and only hold the lock for the counter update itself.
+    """
+
+    REFRESH_PER_SECOND = 4
+
+    # Stage names in the --profile breakdown, by the name passed to observe() ({labels} filled in)
+    STAGES = {
+        'page_fetch_seconds': "get_html (page fetch)",
+        'parse_seconds': "parse_posts (cards + Post)",
+        'db_write_seconds': "Database writes",
+        'exists_check_seconds': "existence checks",
+        'license_fetch_seconds': "license fetch",
+        'ytdlp_download_seconds': "yt-dlp download",
+        'ffmpeg_seconds': "ffmpeg {stage}",
+    }
+    # Downloads timed through add_bytes (videos are timed around yt-dlp, failures included)
+    DOWNLOAD_STAGES = {'photo': "photo download"}
 
     def __init__(self):
         self.console = Console()
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()  # Guards the counters and failed_videos
         self.live = None
         self._enabled = True
 
         # Counters
         self.pages_processed = 0
         self.posts_found = 0
+        self.posts_filtered = 0
 
         # Per-type counters: {type: {'downloaded': n, 'skipped': n, 'failed': n}}
         self.counters = {
@@ -66,11 +119,28 @@ class ProgressTracker:
         # Track failed video names
         self.failed_videos = []
 
+        # Disk I/O avoided by single-pass video post-processing
+        self.io_saved_bytes = 0
+        self.io_saved_videos = 0
+
+        # Deduplication: files reused from an earlier download of the same URL (not downloaded)
+        # and downloads replaced by a link to identical content (stored once)
+        self.dedupe_reused = 0
+        self.dedupe_reused_bytes = 0
+        self.dedupe_linked = 0
+        self.dedupe_linked_bytes = 0
+
         # Uploader ID (discovered from first post, only shown in poster mode)
         self.uploader_id = None
         self._show_uploader_id = False
 
-        # Current activity per thread
+        # Live metrics (see start_metrics); the tracker's events double as metric updates
+        self.metrics: Optional[Metrics] = None
+        # Wall time per pipeline stage (--profile)
+        self.stages: Optional[StageTimer] = None
+
+        # Current activity per thread: {thread_name: (text, progress)}. Single dict stores and
+        # pops are atomic, so activity updates don't take the lock
         self.activities = {}
 
     def set_enabled(self, enabled: bool):
@@ -78,7 +148,13 @@ class ProgressTracker:
         self._enabled = enabled
 
     def _render(self) -> Group:
-        """Render the current progress display."""
+        """Render the current progress display (called from Live's refresh thread)."""
+        with self.lock:
+            pages_processed = self.pages_processed
+            posts_found = self.posts_found
+            posts_filtered = self.posts_filtered
+            counters = {media_type: dict(counts) for media_type, counts in self.counters.items()}
+        activities = self.activities.copy()
         title = f"JFFScraper - {self.uploader_id}" if self.uploader_id else "JFFScraper Progress"
 
         # Stats table
@@ -90,7 +166,8 @@ class ProgressTracker:
 
         # Summary row
         stats_table.add_row(
-            f"Pages: {self.pages_processed}  |  Posts: {self.posts_found}",
+            f"Pages: {pages_processed}  |  Posts: {posts_found}"
+            + (f"  |  Filtered out: {posts_filtered}" if posts_filtered else ""),
             "", "", ""
         )
         stats_table.add_row("", "", "", "")
@@ -99,7 +176,7 @@ class ProgressTracker:
         stats_table.add_row("", "Downloaded", "Skipped", "Failed")
 
         # Photo row
-        p = self.counters['photo']
+        p = counters['photo']
         stats_table.add_row(
             "Photos:",
             str(p['downloaded']),
@@ -108,7 +185,7 @@ class ProgressTracker:
         )
 
         # Video row
-        v = self.counters['video']
+        v = counters['video']
         stats_table.add_row(
             "Videos:",
             str(v['downloaded']),
@@ -117,7 +194,7 @@ class ProgressTracker:
         )
 
         # Text row
-        t = self.counters['text']
+        t = counters['text']
         stats_table.add_row(
             "Texts:",
             str(t['downloaded']),
@@ -128,11 +205,11 @@ class ProgressTracker:
         parts = [Rule(title, style="blue"), stats_table]
 
         # Activity section
-        if self.activities:
+        if activities:
             activity_table = Table.grid(padding=(0, 1))
             activity_table.add_column()
             activity_table.add_column(width=20)
-            for activity_text, progress in self.activities.values():
+            for activity_text, progress in activities.values():
                 if progress >= 0:
                     bar = ProgressBar(total=1.0, completed=progress, width=20)
                     activity_table.add_row(activity_text, bar)
@@ -146,7 +223,11 @@ class ProgressTracker:
         """Start the live display."""
         if not self._enabled:
             return
-        self.live = Live(self._render(), console=self.console, refresh_per_second=4)
+        self.live = Live(
+            console=self.console,
+            refresh_per_second=self.REFRESH_PER_SECOND,
+            get_renderable=self._render,
+        )
         self.live.start()
 
     def stop(self):
@@ -163,6 +244,8 @@ class ProgressTracker:
         self.console.print(f"[bold]{title}[/bold]")
         self.console.print(f"  Pages processed: {self.pages_processed}")
         self.console.print(f"  Posts found: {self.posts_found}")
+        if self.posts_filtered:
+            self.console.print(f"  Posts filtered out: {self.posts_filtered}")
         self.console.print()
         p = self.counters['photo']
         self.console.print(f"  Photos: {p['downloaded']} downloaded, {p['skipped']} skipped, {p['failed']} failed")
@@ -171,6 +254,21 @@ class ProgressTracker:
         t = self.counters['text']
         self.console.print(f"  Texts: {t['downloaded']} downloaded, {t['skipped']} skipped")
 
+        if self.io_saved_videos:
+            total_gb = self.io_saved_bytes / 1024 ** 3
+            per_video_mb = self.io_saved_bytes / self.io_saved_videos / 1024 ** 2
+            self.console.print(
+                f"  Post-processing: single pass saved {total_gb:.2f} GB of disk I/O "
+                f"({per_video_mb:.1f} MB per video)"
+            )
+
+        if self.dedupe_reused or self.dedupe_linked:
+            self.console.print(
+                f"  Deduplication: {self.dedupe_reused} files reused without downloading "
+                f"({self.dedupe_reused_bytes / 1024 ** 2:.1f} MB), {self.dedupe_linked} downloads linked "
+                f"to identical files ({self.dedupe_linked_bytes / 1024 ** 2:.1f} MB of disk)"
+            )
+
         # List failed videos
         if self.failed_videos:
             self.console.print()
@@ -178,22 +276,26 @@ class ProgressTracker:
             for name in self.failed_videos:
                 self.console.print(f"  - {name}")
 
-    def _update_display(self):
-        """Update the live display if running."""
-        if self.live:
-            self.live.update(self._render())
-
     def increment_page(self):
         """Increment pages processed counter."""
         with self.lock:
             self.pages_processed += 1
-            self._update_display()
+        if self.metrics:
+            self.metrics.inc("pages_fetched_total")
 
     def add_posts(self, count: int):
         """Add to posts found counter."""
         with self.lock:
             self.posts_found += count
-            self._update_display()
+        if self.metrics:
+            self.metrics.inc("posts_parsed_total", count)
+
+    def add_filtered(self, count: int):
+        """Add to the counter of posts skipped by the post filter."""
+        with self.lock:
+            self.posts_filtered += count
+        if self.metrics:
+            self.metrics.inc("posts_filtered_total", count)
 
     def increment(self, media_type: str, status: str, name: str = None):
         """Increment a counter for the given media type and status."""
@@ -203,26 +305,63 @@ class ProgressTracker:
                 # Track failed video names
                 if media_type == 'video' and status == 'failed' and name:
                     self.failed_videos.append(name)
-                self._update_display()
+        if self.metrics:
+            self.metrics.inc("media_total", type=media_type, status=status)
+
+    def add_bytes(self, media_type: str, nbytes: int, seconds: Optional[float] = None):
+        """Record a finished download of nbytes (metrics only) and, given its duration, its throughput."""
+        if self.metrics:
+            self.metrics.inc("downloaded_bytes_total", nbytes, type=media_type)
+            if seconds:
+                self.metrics.observe("download_throughput_bytes_per_second", nbytes / seconds, type=media_type)
+        stage = self.DOWNLOAD_STAGES.get(media_type)
+        if self.stages and stage and seconds is not None:
+            self.stages.add(stage, seconds)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a duration (or other sample) in the metrics histograms and the stage breakdown."""
+        if self.metrics:
+            self.metrics.observe(name, value, **labels)
+        if self.stages:
+            self.stages.add(self.STAGES.get(name, name).format(**labels), value)
+
+    def add_db_batch(self, rows: int, seconds: float):
+        """A database writer committed a batch of rows (Database.on_batch)."""
+        self.observe("db_write_seconds", seconds)
+        if self.metrics:
+            self.metrics.inc("db_write_rows_total", rows)
+
+    def add_io_saved(self, nbytes: int):
+        """Record the disk I/O one video avoided by single-pass post-processing."""
+        with self.lock:
+            self.io_saved_bytes += nbytes
+            self.io_saved_videos += 1
+
+    def add_dedupe(self, nbytes: int, downloaded: bool):
+        """Record a deduplicated media file: linked after downloading, or reused without downloading."""
+        with self.lock:
+            if downloaded:
+                self.dedupe_linked += 1
+                self.dedupe_linked_bytes += nbytes
+            else:
+                self.dedupe_reused += 1
+                self.dedupe_reused_bytes += nbytes
+        if self.metrics:
+            self.metrics.inc("dedupe_bytes_total", nbytes, kind="linked" if downloaded else "reused")
 
     def set_activity(self, thread_name: str, activity: str, progress: float = -1):
         """Set the current activity for a thread. progress: 0.0-1.0 for bar, -1 for none."""
-        with self.lock:
-            self.activities[thread_name] = (activity, progress)
-            self._update_display()
+        self.activities[thread_name] = (activity, progress)
 
     def clear_activity(self, thread_name: str):
         """Clear the activity for a thread."""
-        with self.lock:
-            self.activities.pop(thread_name, None)
-            self._update_display()
+        self.activities.pop(thread_name, None)
 
     def set_uploader_id(self, uploader_id: str):
         """Set the uploader ID (typically from first post)."""
         with self.lock:
             if not self.uploader_id and self._show_uploader_id:
                 self.uploader_id = uploader_id
-                self._update_display()
 
     def enable_uploader_id_display(self):
         """Enable showing uploader ID (for poster mode)."""
@@ -233,6 +372,26 @@ class ProgressTracker:
 progress_tracker: ProgressTracker = None
 
 
+@contextlib.contextmanager
+def timed(name: str, **labels):
+    """Report the wall time of the block to the progress tracker (metrics and --profile stages)."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        if progress_tracker:
+            progress_tracker.observe(name, time.monotonic() - start, **labels)
+
+# HTML parser backend (see get_html_parser)
+html_parser = None
+
+# URL and content hash index shared by every uploader (None when [Dedupe] is disabled)
+media_index: MediaIndex = None
+
+# Posts to keep ([Filter] and --since/--until/--types; None keeps every post)
+post_filter: PostFilter = None
+
+
 def get_db(uploader_id: str) -> Database:
     """Get or create the database for a specific uploader."""
     db_dir = os.path.join(config.get('Paths', 'save_path'), uploader_id)
@@ -240,28 +399,65 @@ def get_db(uploader_id: str) -> Database:
     db_path = os.path.join(db_dir, 'metadata.db')
     return Database.get_instance(db_path)
 
+def get_http_pool() -> ClientPool:
+    """Get the shared HTTP client pool (created from config on first use)."""
+    global http_pool
+    if http_pool is None:
+        site_hosts = {"justfor.fans"}
+        for key in ('api_url', 'api_url_poster'):
+            site_hosts.add(urllib.parse.urlparse(config.get('API', key, fallback="")).hostname)
+        http_pool = ClientPool(
+            site_hosts=site_hosts,
+            site_max_connections=config.getint('HTTP', 'site_max_connections', fallback=8),
+            media_max_connections=config.getint('HTTP', 'media_max_connections', fallback=16),
+            http2=config.getboolean('HTTP', 'http2', fallback=True),
+            site_rate=config.getfloat('HTTP', 'site_rate', fallback=0.0),
+            site_burst=config.getint('HTTP', 'site_burst', fallback=4),
+            media_rate=config.getfloat('HTTP', 'media_rate', fallback=0.0),
+            media_burst=config.getint('HTTP', 'media_burst', fallback=16),
+            retry=RetryPolicy(
+                retries=config.getint('HTTP', 'retries', fallback=5),
+                base=config.getfloat('HTTP', 'backoff_base', fallback=1.0),
+                cap=config.getfloat('HTTP', 'backoff_max', fallback=60.0),
+            ),
+        )
+    return http_pool
+
+
+def get_html_parser():
+    """Get the configured HTML parser backend (created on first use)."""
+    global html_parser
+    if html_parser is None:
+        html_parser = get_parser(config.get('General', 'html_parser', fallback='auto'))
+    return html_parser
+
+
 class Post:
-    def __init__(self, post_soup: bs4.Tag):
-        self.db_id = None  # Set after database insertion
-        self.post_soup = post_soup
+    def __init__(self, card: Card):
+        self.in_db = False  # Set once the post has been queued for the database
+        self.filtered = False  # Set when the post filter rejects the post: nothing is stored or saved
+        self.card = card
+        self.ticket: Optional['PageTicket'] = None  # Outstanding work of the page the post came from
 
-        ptext = post_soup.select("div.fr-view")
-        classvals = post_soup.attrs["class"]
+        ptext = card.select("div.fr-view")
+        classvals = card.classes
+        # Holds the date text, the post link and data-server-time; looked up once
+        card_subtitle = card.select("div.mbsc-card-subtitle")
 
         self.uploader_id: str = re.fullmatch(
             r"""location\.href=['"]/?(.+?)['"]""",
-            post_soup.select("h5.mbsc-card-title.mbsc-bold span")[0].get("onclick"),
+            card.select("h5.mbsc-card-title.mbsc-bold span")[0].attr("onclick"),
         ).group(1)
-        self.post_date_str = post_soup.select("div.mbsc-card-subtitle")[0].text.strip()
+        self.post_date_str = card_subtitle[0].text.strip()
         # Stripping "burning post" alert
         self.post_date_str = self.post_date_str.split("This post will disappear")[
             0
         ].strip()
 
-        self.pid = base64.b64decode(post_soup.attrs["data-pid"]).decode()
+        self.pid = base64.b64decode(card.attr("data-pid")).decode()
         self.full_text = ptext[0].text.strip() if ptext else ""
         self.tags = list(
-            x.text.strip().strip("#") for x in post_soup.select("div.postTags a")
+            x.text.strip().strip("#") for x in card.select("div.postTags a")
         )
         self.access_control = next(
             (
@@ -286,10 +482,10 @@ class Post:
 
         self.pinned = "pinned" in classvals
 
-        store_button = post_soup.select("div.storeItemWidget button")
+        store_button = card.select("div.storeItemWidget button")
         if len(store_button) > 0:
             store_url = re.fullmatch(
-                r"""location\.href=['"]/?(.+?)['"]""", store_button[0].get("onclick")
+                r"""location\.href=['"]/?(.+?)['"]""", store_button[0].attr("onclick")
             ).group(1)
             self.store_url = urllib.parse.urljoin("https://justfor.fans/", store_url)
 
@@ -299,18 +495,17 @@ class Post:
         self.post_date_iso = "Unknown Date"
 
         try:
-            pinned = post_soup.select("div.pinnedNotice")
+            pinned = card.select("div.pinnedNotice")
             if pinned is not None:
                 self.post_date = "Pinned"
         except:
             pass
 
         try:
-            card_subtitle = post_soup.select("div.mbsc-card-subtitle")
             post_url = html.unescape(
                 re.fullmatch(
                     r"""location\.href=['"]/?(.+?)['"]""",
-                    card_subtitle[0].get("onclick"),
+                    card_subtitle[0].attr("onclick"),
                 ).group(1)
             )
             self.post_url = urllib.parse.urljoin("https://justfor.fans/", post_url)
@@ -326,7 +521,7 @@ class Post:
                     self.upload_date_iso = dt.isoformat()
 
             # Use data-server-time for post_date (more reliable than text parsing)
-            server_time = card_subtitle[0].get("data-server-time")
+            server_time = card_subtitle[0].attr("data-server-time")
             if server_time:
                 dt = datetime.datetime.strptime(server_time, "%Y-%m-%d %H:%M:%S")
                 self.post_date = dt.strftime("%Y-%m-%d")
@@ -348,9 +543,9 @@ class Post:
         if self.post_date in ("Unknown Date", "Pinned"):
             try:
                 # Try video overlay: id="overlay-Posts-{user_id}-MC-{timestamp}"
-                overlay = post_soup.select_one("div.video-thumbnail[id^='overlay-Posts-']")
+                overlay = card.select_one("div.video-thumbnail[id^='overlay-Posts-']")
                 if overlay:
-                    overlay_id = overlay.get("id", "")
+                    overlay_id = overlay.attr("id", "")
                     mc_match = re.search(r"-MC-(\d+)", overlay_id)
                     if mc_match:
                         ts = int(mc_match.group(1))
@@ -366,9 +561,9 @@ class Post:
         # Another fallback: gridAction onclick contains postHash with timestamp
         if self.post_date in ("Unknown Date", "Pinned"):
             try:
-                grid_action = post_soup.select_one("a.gridAction")
+                grid_action = card.select_one("a.gridAction")
                 if grid_action:
-                    onclick = grid_action.get("onclick", "")
+                    onclick = grid_action.attr("onclick", "")
                     hash_match = re.search(r'postHash:\s*["\']([^"\']+)["\']', onclick)
                     if hash_match:
                         post_hash = hash_match.group(1)
@@ -411,95 +606,145 @@ def create_folder(post: Post) -> str:
     return fpath
 
 
-def photo_save(post: Post):
-    thread_name = threading.current_thread().name
-    if progress_tracker:
-        progress_tracker.set_activity(thread_name, f"Photo: {post.basename[:50]}")
+def direct_download_options() -> dict:
+    """Segmenting settings for direct_download.download from config."""
+    return {
+        'segment_threshold': max(config.getint('Download', 'segment_threshold_mb', fallback=8), 1) << 20,
+        'max_segments': max(config.getint('Download', 'max_segments', fallback=4), 1),
+    }
 
-    photos_img = post.post_soup.select("div.imageGallery.galleryLarge img.expandable")
 
-    if len(photos_img) == 0:
-        photos_img.append(post.post_soup.select("img.expandable")[0])
+def photo_items(post: Post) -> list[tuple[int, str]]:
+    """Gallery images of a photo post as (index, url) pairs."""
+    photos_img = post.card.select("div.imageGallery.galleryLarge img.expandable")
 
-    db = get_db(post.uploader_id)
-    downloaded_any = False
-    skipped_any = False
-    failed_any = False
+    if len(photos_img) == 0:
+        photos_img.append(post.card.select("img.expandable")[0])
 
+    items = []
     for i, img in enumerate(photos_img):
-        if "src" in img.attrs:
-            imgsrc = img.attrs["src"]
-        elif "data-lazy" in img.attrs:
-            imgsrc = img.attrs["data-lazy"]
-        else:
-            continue
-        ext = imgsrc.split(".")[-1]
+        imgsrc = img.attr("src")
+        if imgsrc is None:
+            imgsrc = img.attr("data-lazy")
+        if imgsrc is not None:
+            items.append((i, imgsrc))
+    return items
 
-        folder = create_folder(post)
-        ppath = ".".join(
-            [os.path.join(folder, "{}.{:02}".format(post.basename, i)), ext]
-        )
 
-        # Check for existing file
-        existing_files = glob.glob(
-            os.path.join(folder, post.basename[:50]) + "*.{:02}.{}".format(i, ext)
-        )
-        exists = len(existing_files) > 0
-        existing_path = existing_files[0] if exists else None
-
-        # Always insert/update media record
-        media_id = None
-        if post.db_id:
-            media_id = db.insert_media(
-                post_db_id=post.db_id,
-                media_type="photo",
-                url=imgsrc
-            )
+def _photo_prepare(post: Post, folder: str, db: Database, i: int, imgsrc: str) -> Optional[str]:
+    """
+    Record a gallery image in the database and check for an existing copy.
+    Returns the destination path to download to, or None if the image is skipped.
+    """
+    ext = imgsrc.split(".")[-1]
+    ppath = ".".join(
+        [os.path.join(folder, "{}.{:02}".format(post.basename, i)), ext]
+    )
 
-        # Skip download if file exists
-        if not config.getboolean('General', 'overwrite_existing') and exists:
-            # Update media with existing file info
-            if media_id and existing_path:
-                file_size = os.path.getsize(existing_path) if os.path.exists(existing_path) else None
-                db.update_media(media_id, file_path=existing_path, file_size=file_size)
-            skipped_any = True
-            continue
+    # Check for existing file
+    with timed("exists_check_seconds"):
+        file_index = FileIndex.get_instance(folder)
+        existing_path = file_index.find(post.basename[:50], ".{:02}.{}".format(i, ext))
+    exists = existing_path is not None
 
-        tmp_ppath = ppath + ".tmp"
+    # Always insert/update media record
+    if post.in_db:
+        db.insert_media(post.pid, media_type="photo", url=imgsrc)
 
-        try:
-            response = scraper.get(imgsrc, stream=True)
+    # Skip download if file exists
+    if not config.getboolean('General', 'overwrite_existing') and exists:
+        # Update media with existing file info
+        if post.in_db and existing_path:
+            file_size = os.path.getsize(existing_path) if os.path.exists(existing_path) else None
+            db.update_media(post.pid, imgsrc, file_path=existing_path, file_size=file_size)
+        return None
+
+    # Downloaded before for another post or uploader: take that copy instead
+    reused = media_index.reuse(imgsrc, ppath) if media_index else None
+    if reused:
+        sha256, file_size = reused
+        file_index.add(ppath)
+        if progress_tracker:
+            progress_tracker.add_dedupe(file_size, downloaded=False)
+        if post.in_db:
+            db.update_media(post.pid, imgsrc, file_path=ppath, file_size=file_size, sha256=sha256)
+        return None
 
-            with open(tmp_ppath, "wb") as out_file:
-                for chunk in response.iter_content():
-                    out_file.write(chunk)
-            response.close()
-            os.rename(tmp_ppath, ppath)
+    return ppath
 
-            # Update media with file path and size
-            if media_id:
-                file_size = os.path.getsize(ppath) if os.path.exists(ppath) else None
-                db.update_media(media_id, file_path=ppath, file_size=file_size)
 
-            downloaded_any = True
+def _photo_finish(post: Post, folder: str, db: Database, imgsrc: str, ppath: str,
+                  elapsed: Optional[float] = None, sha256: Optional[str] = None):
+    """Record a completed download (which took elapsed seconds) and deduplicate its content."""
+    FileIndex.get_instance(folder).add(ppath)
+    file_size = os.path.getsize(ppath) if os.path.exists(ppath) else None
+    if progress_tracker and file_size is not None:
+        progress_tracker.add_bytes('photo', file_size, elapsed)
 
-        except KeyboardInterrupt:
-            sys.exit(0)
-        except Exception:
-            import traceback
-            with print_lock:
-                print(traceback.format_exc())
-            failed_any = True
+    if media_index and sha256 and file_size is not None:
+        if media_index.store(imgsrc, ppath, sha256, file_size) and progress_tracker:
+            progress_tracker.add_dedupe(file_size, downloaded=True)
+
+    # Update media with file path, size and content hash
+    if post.in_db:
+        db.update_media(post.pid, imgsrc, file_path=ppath, file_size=file_size, sha256=sha256)
+
+
+def _photo_save_item(post: Post, folder: str, db: Database, i: int, imgsrc: str) -> str:
+    """Download a single gallery image. Returns 'downloaded', 'skipped' or 'failed'."""
+    ppath = _photo_prepare(post, folder, db, i, imgsrc)
+    if ppath is None:
+        return 'skipped'
+
+    try:
+        # Resumes a leftover .tmp from an earlier run and splits large files into parallel ranges
+        start = time.monotonic()
+        _, sha256 = direct_download.download(get_http_pool(), imgsrc, ppath, **direct_download_options())
+        _photo_finish(post, folder, db, imgsrc, ppath, time.monotonic() - start, sha256)
+
+        return 'downloaded'
+
+    except KeyboardInterrupt:
+        sys.exit(0)
+    except Exception:
+        import traceback
+        with print_lock:
+            print(traceback.format_exc())
+        return 'failed'
 
-    # Update progress tracker
+
+def report_photo_statuses(statuses: list[str]):
+    """Count a photo post once in the progress tracker from its per-image statuses."""
     if progress_tracker:
-        if downloaded_any:
+        if 'downloaded' in statuses:
             progress_tracker.increment('photo', 'downloaded')
-        elif skipped_any:
+        elif 'skipped' in statuses:
             progress_tracker.increment('photo', 'skipped')
-        if failed_any:
+        if 'failed' in statuses:
             progress_tracker.increment('photo', 'failed')
 
+
+def photo_save(post: Post) -> bool:
+    """Download a photo post's gallery. Returns False if any image failed."""
+    thread_name = threading.current_thread().name
+    if progress_tracker:
+        progress_tracker.set_activity(thread_name, f"Photo: {post.basename[:50]}")
+
+    items = photo_items(post)
+    folder = create_folder(post)
+    db = get_db(post.uploader_id)
+
+    # Images of one gallery are independent, so fetch them side by side
+    if gallery_executor and len(items) > 1:
+        statuses = list(gallery_executor.map(
+            lambda item: _photo_save_item(post, folder, db, *item), items
+        ))
+    else:
+        statuses = [_photo_save_item(post, folder, db, i, imgsrc) for i, imgsrc in items]
+
+    report_photo_statuses(statuses)
+    return 'failed' not in statuses
+
 def decrypt_file_internal(path, hex_key):
     f_base, f_ext = os.path.splitext(path)
     out_path = f"{f_base}_decrypted{f_ext}"
@@ -517,7 +762,87 @@ def decrypt_file_internal(path, hex_key):
     subprocess.run(command, check=True, capture_output=True, text=True, encoding='utf-8', errors='ignore')
     shutil.move(out_path, path)
 
-def video_save(post: Post):
+def run_ffmpeg_to(command: list[str], vpath: str):
+    """
+    Run an ffmpeg command (without its output argument) that writes an mp4 to vpath. ffmpeg
+    writes <vpath>.tmp, which then replaces vpath: a deduplicated vpath is a hardlink shared
+    with other posts' files, and rewriting it in place would change (or on failure truncate)
+    every copy. A failed run leaves no partial file a later run would take for a finished download.
+    """
+    tmp_path = vpath + ".tmp"
+    try:
+        subprocess.run(command + ['-f', 'mp4', tmp_path],
+                       check=True, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+        os.replace(tmp_path, vpath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def decrypt_and_merge(stream_files: list[str], hex_key: str, vpath: str):
+    """
+    Decrypt and mux the downloaded streams in a single ffmpeg pass into vpath.
+    Replaces one decrypt pass per stream plus a separate merge pass.
+    """
+    command = ['ffmpeg']
+    for f_path in stream_files:
+        command += ['-decryption_key', hex_key, '-i', f_path]
+    command += [
+        '-c', 'copy',
+        '-y',
+        '-shortest',
+        '-loglevel', 'error',
+    ]
+    run_ffmpeg_to(command, vpath)
+
+def video_info(video_link: Card) -> tuple[str, str, str, str]:
+    """Extract (url, quality, license_url, kid) from a post's videoBlock link."""
+    vidurljumble = video_link.attr("onclick")
+
+    jumble_args = vidurljumble.split(", ")
+    vidurl_json_str = jumble_args[1] # Arg 2: {"540p":...}
+
+    vidurl = json.loads(vidurl_json_str)
+    url = vidurl.get("All", "")
+    quality = "All"
+    if url == "":
+        url = vidurl.get("1080p", "")
+        quality = "1080p"
+    if url == "":
+        url = vidurl.get("540p", "")
+        quality = "540p"
+
+    license_url_str = jumble_args[6] # Arg 7: "https://..."...
+    license_url = license_url_str.strip('")')
+    parsed_license_url = urllib.parse.urlparse(license_url)
+    query_params = urllib.parse.parse_qs(parsed_license_url.query)
+    kid = query_params['kid'][0]
+
+    return url, quality, license_url, kid
+
+
+def license_key(license_url: str, response) -> str:
+    """Hex encoded key from a license response. Rejects anything that isn't a 16 byte AES key."""
+    if response.status_code != 200 or len(response.content) != 16:
+        raise ValueError(f"Bad license response from {license_url}: HTTP {response.status_code}, {len(response.content)} bytes")
+    return response.content.hex()
+
+
+def fetch_license(license_url: str) -> str:
+    """Fetch the decryption key for a video. Returns it hex encoded."""
+    start = time.monotonic()
+    license_response = get_http_pool().get(license_url)
+    if progress_tracker:
+        progress_tracker.observe("license_fetch_seconds", time.monotonic() - start)
+    return license_key(license_url, license_response)
+
+
+def video_save(post: Post, hex_key: Optional[str] = None) -> bool:
+    """
+    Download, decrypt and merge a video post. hex_key skips the license request when already known.
+    Returns False if the video failed; one handed to the post-processing pool reports there.
+    """
     thread_name = threading.current_thread().name
     if progress_tracker:
         progress_tracker.set_activity(thread_name, f"Video: {post.basename[:50]}")
@@ -525,77 +850,100 @@ def video_save(post: Post):
     folder = create_folder(post)
     vpath = os.path.join(folder, post.basename) + ".mp4"
 
-    downloading = next(
-        iter(glob.glob(os.path.join(folder, f"* - {post.pid} -*.ytdl"))), None
-    )
-    downloaded = next(
-        iter(glob.glob(os.path.join(folder, f"* - {post.pid} -*.mp4"))), None
-    )
+    with timed("exists_check_seconds"):
+        file_index = FileIndex.get_instance(folder)
+        downloading = file_index.find_pid(post.pid, ".ytdl")
+        downloaded = file_index.find_pid(post.pid, ".mp4")
     exists = downloading is None and downloaded is not None
 
     db = get_db(post.uploader_id)
-    media_id = None
 
     try:
-        videoBlock = post.post_soup.select("div.videoBlock a")
+        videoBlock = post.card.select("div.videoBlock a")
         if len(videoBlock) == 0:
             # Store posts (paid content) are not failures, just skip them
             if post.store_url is None and progress_tracker:
                 progress_tracker.increment('video', 'failed', post.basename)
-            return
-        vidurljumble = videoBlock[0].attrs["onclick"]
-
-        jumble_args = vidurljumble.split(", ")
-        vidurl_json_str = jumble_args[1] # Arg 2: {"540p":...}
-
-        vidurl = json.loads(vidurl_json_str)
-        url = vidurl.get("All", "")
-        quality = "All"
-        if url == "":
-            url = vidurl.get("1080p", "")
-            quality = "1080p"
-        if url == "":
-            url = vidurl.get("540p", "")
-            quality = "540p"
-
-        license_url_str = jumble_args[6] # Arg 7: "https://..."...
-        license_url = license_url_str.strip('")')
-        parsed_license_url = urllib.parse.urlparse(license_url)
-        query_params = urllib.parse.parse_qs(parsed_license_url.query)
-        kid = query_params['kid'][0]
-
-        license_response = scraper.get(license_url)
-        hex_key = license_response.content.hex()
+            return post.store_url is not None
+        url, quality, license_url, kid = video_info(videoBlock[0])
 
-        # Insert media record with video metadata
-        if post.db_id:
-            media_id = db.insert_media(
-                post_db_id=post.db_id,
-                media_type="video",
-                url=url,
-                quality=quality,
-                license_url=license_url,
-                kid=kid,
-                decryption_key=hex_key
-            )
-
-        # Skip download if file exists
+        # Skip download if file exists, before any license request
         if not config.getboolean('General', 'overwrite_existing') and exists:
+            if post.in_db:
+                db.insert_media(
+                    post.pid,
+                    media_type="video",
+                    url=url,
+                    quality=quality,
+                    license_url=license_url,
+                    kid=kid
+                )
             if downloaded is not None and downloaded != vpath:
                 os.rename(downloaded, vpath)
+                file_index.discard(downloaded)
+                file_index.add(vpath)
+                if media_index:
+                    media_index.moved(downloaded, vpath)
             # Update media with existing file info
             final_path = vpath if os.path.exists(vpath) else downloaded
-            if media_id and final_path:
+            if post.in_db and final_path:
                 file_size = os.path.getsize(final_path) if os.path.exists(final_path) else None
-                db.update_media(media_id, file_path=final_path, file_size=file_size)
+                db.update_media(post.pid, url, file_path=final_path, file_size=file_size)
             if progress_tracker:
                 progress_tracker.increment('video', 'skipped')
-            return
+            return True
+
+        # Downloaded before for another post or uploader: take that copy, no license or download needed
+        reused = media_index.reuse(url, vpath) if media_index else None
+        if reused:
+            sha256, file_size = reused
+            file_index.add(vpath)
+            if post.in_db:
+                db.insert_media(
+                    post.pid,
+                    media_type="video",
+                    url=url,
+                    quality=quality,
+                    license_url=license_url,
+                    kid=kid
+                )
+                db.update_media(post.pid, url, file_path=vpath, file_size=file_size, sha256=sha256)
+            if progress_tracker:
+                progress_tracker.add_dedupe(file_size, downloaded=False)
+                progress_tracker.increment('video', 'skipped')
+            return True
+
+        # Keys are stored per kid; only ask the license server for ones not seen before
+        if hex_key is None:
+            hex_key = db.get_decryption_key(kid)
+        if hex_key is None:
+            hex_key = fetch_license(license_url)
+
+        # Insert media record with video metadata
+        if post.in_db:
+            db.insert_media(
+                post.pid,
+                media_type="video",
+                url=url,
+                quality=quality,
+                license_url=license_url,
+                kid=kid,
+                decryption_key=hex_key
+            )
 
         temp_path = os.path.join(folder, post.pid)
 
+        # yt-dlp reports running byte totals per output file; the bandwidth cap is applied to the increase
+        received_bytes: dict[str, int] = {}
+
         # Progress hook for yt-dlp
         def ydl_progress_hook(d):
+            if bandwidth_limiter and d['status'] == 'downloading':
+                received = d.get('downloaded_bytes') or 0
+                previous = received_bytes.get(d.get('filename'), 0)
+                received_bytes[d.get('filename')] = received
+                if received > previous:
+                    bandwidth_limiter.consume(received - previous, 'video')
             if not progress_tracker:
                 return
             if d['status'] == 'downloading':
@@ -627,10 +975,16 @@ def video_save(post: Post):
                     f"Video: {post.basename[:30]} [Processing...]"
                 )
 
+        fragments_limit = adaptive_limits.get('fragments')
+        if fragments_limit:
+            concurrent_fragments = fragments_limit.limit
+        else:
+            concurrent_fragments = max(int(config.get('General', 'concurrent_fragments')), 1)
+
         ydl_opts = {
             "quiet": True,
             "no_warnings": True,
-            "concurrent_fragment_downloads": max(int(config.get('General', 'concurrent_fragments')), 1),
+            "concurrent_fragment_downloads": concurrent_fragments,
             "retries": 10,
             "file_access_retries": 10,
             "updatetime": True,
@@ -640,21 +994,69 @@ def video_save(post: Post):
             "format": "bv*+ba/b",
             "progress_hooks": [ydl_progress_hook],
         }
-        with YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        if bandwidth_limiter and bandwidth_limiter.current_rate():
+            # Also bounds a single transfer between progress hook calls
+            ydl_opts["ratelimit"] = bandwidth_limiter.current_rate()
+        download_start = time.monotonic()
+        try:
+            with timed("ytdlp_download_seconds"), YoutubeDL(ydl_opts) as ydl:
+                ydl.download([url])
+        except Exception:
+            if fragments_limit:
+                fragments_limit.record(time.monotonic() - download_start, ok=False)
+            raise
 
         vpath_base = os.path.splitext(temp_path)[0]
         search_pattern = f"{vpath_base}.f*"
         downloaded_files = glob.glob(search_pattern)
 
+        stream_bytes = sum(os.path.getsize(f) for f in downloaded_files)
+        elapsed = time.monotonic() - download_start
+        if progress_tracker:
+            progress_tracker.add_bytes('video', stream_bytes, elapsed)
+        if fragments_limit:
+            # Videos differ in size, so the latency sample is download time per MB
+            fragments_limit.record(elapsed / max(stream_bytes / 1024 ** 2, 1), nbytes=stream_bytes)
+
+        if postprocess_executor:
+            # Hand the streams to the post-processing pool and free this thread for the next download
+            submit_postprocess(post, url, hex_key, downloaded_files, vpath)
+            if progress_tracker:
+                progress_tracker.clear_activity(thread_name)
+        else:
+            video_postprocess(post, url, hex_key, downloaded_files, vpath)
+        return True
+
+    except KeyboardInterrupt:
+        sys.exit(0)
+    except Exception:
+        import traceback
+        with print_lock:
+            print(traceback.format_exc())
+        if progress_tracker:
+            progress_tracker.increment('video', 'failed', post.basename)
+        return False
+
+
+def video_postprocess(post: Post, url: str, hex_key: str, downloaded_files: list[str], vpath: str):
+    """Decrypt and merge the downloaded streams of a video post into vpath and record the result."""
+    thread_name = threading.current_thread().name
+    folder = os.path.dirname(vpath)
+    file_index = FileIndex.get_instance(folder)
+    db = get_db(post.uploader_id)
+
+    video_file = next((f for f in downloaded_files if f.endswith('.mp4')), None)
+    audio_file = next((f for f in downloaded_files if f.endswith('.m4a') or f.endswith('.m4b')), None)
+
+    if config.get('General', 'postprocess_mode', fallback='single_pass') == 'separate':
         # Decrypt stage
         if progress_tracker:
             progress_tracker.set_activity(thread_name, f"Video: {post.basename[:30]} [Decrypting...]")
+        stage_start = time.monotonic()
         for f_path in downloaded_files:
             decrypt_file_internal(f_path, hex_key)
-
-        video_file = next((f for f in downloaded_files if f.endswith('.mp4')), None)
-        audio_file = next((f for f in downloaded_files if f.endswith('.m4a') or f.endswith('.m4b')), None)
+        if progress_tracker:
+            progress_tracker.observe("ffmpeg_seconds", time.monotonic() - stage_start, stage="decrypt")
 
         # Merge stage
         if progress_tracker:
@@ -667,32 +1069,85 @@ def video_save(post: Post):
             '-y',          # Overwrite output file if it exists
             '-shortest',
             '-loglevel', 'error', # Quieter output
-            vpath
         ]
-        subprocess.run(merge_command, check=True, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+        stage_start = time.monotonic()
+        run_ffmpeg_to(merge_command, vpath)
+        if progress_tracker:
+            progress_tracker.observe("ffmpeg_seconds", time.monotonic() - stage_start, stage="merge")
+    else:
+        if progress_tracker:
+            progress_tracker.set_activity(thread_name, f"Video: {post.basename[:30]} [Decrypting + merging...]")
+        # A combined download (no separate audio stream) is a single input
+        stream_files = [f for f in (video_file, audio_file) if f] or downloaded_files
+        stream_bytes = sum(os.path.getsize(f) for f in stream_files)
+        stage_start = time.monotonic()
+        decrypt_and_merge(stream_files, hex_key, vpath)
+        if progress_tracker:
+            progress_tracker.observe("ffmpeg_seconds", time.monotonic() - stage_start, stage="decrypt_merge")
+        # The separate passes would also have read and rewritten every stream once more
+        if progress_tracker:
+            progress_tracker.add_io_saved(2 * stream_bytes)
+    file_index.add(vpath)
 
-        for f in downloaded_files:
-            os.remove(f)
+    for f in downloaded_files:
+        os.remove(f)
+        file_index.discard(f)
 
-        # Update media with file path and size
-        if media_id:
-            file_size = os.path.getsize(vpath) if os.path.exists(vpath) else None
-            db.update_media(media_id, file_path=vpath, file_size=file_size)
+    file_size = os.path.getsize(vpath) if os.path.exists(vpath) else None
+    sha256 = None
+    if media_index and file_size is not None:
+        # ffmpeg writes the final file, so its hash is read back once here
+        sha256 = direct_download.file_sha256(vpath)
+        if media_index.store(url, vpath, sha256, file_size) and progress_tracker:
+            progress_tracker.add_dedupe(file_size, downloaded=True)
 
-        if progress_tracker:
-            progress_tracker.increment('video', 'downloaded')
+    # Update media with file path, size and content hash
+    if post.in_db:
+        db.update_media(post.pid, url, file_path=vpath, file_size=file_size, sha256=sha256)
 
-    except KeyboardInterrupt:
-        sys.exit(0)
+    if progress_tracker:
+        progress_tracker.increment('video', 'downloaded')
+
+
+def submit_postprocess(post: Post, *args):
+    """
+    Queue a downloaded video for video_postprocess in the post-processing pool. Blocks while
+    the pool's backlog is full, so downloads can't run arbitrarily far ahead of ffmpeg.
+    """
+    postprocess_slots.acquire()
+    if post.ticket:
+        post.ticket.add()
+    try:
+        postprocess_executor.submit(_postprocess_job, post, *args)
+    except RuntimeError:  # Pool already shut down
+        postprocess_slots.release()
+        raise
+
+
+def _postprocess_job(post: Post, *args):
+    """Post-processing pool task: runs video_postprocess and reports its outcome like video_save."""
+    thread_name = threading.current_thread().name
+    ok = False
+    try:
+        if abort_event.is_set():
+            return  # Ctrl-C: leave the streams; the next run downloads the video again
+        video_postprocess(post, *args)
+        ok = True
     except Exception:
         import traceback
         with print_lock:
             print(traceback.format_exc())
         if progress_tracker:
             progress_tracker.increment('video', 'failed', post.basename)
+    finally:
+        postprocess_slots.release()
+        if post.ticket:
+            post.ticket.finish(ok)
+        if progress_tracker:
+            progress_tracker.clear_activity(thread_name)
 
 
-def text_save(post: Post):
+def text_save(post: Post) -> bool:
     thread_name = threading.current_thread().name
     if progress_tracker:
         progress_tracker.set_activity(thread_name, f"Text: {post.basename[:50]}")
@@ -700,11 +1155,13 @@ def text_save(post: Post):
     folder = create_folder(post)
     tpath = os.path.join(folder, post.basename) + ".txt"
 
-    exists = len(glob.glob(os.path.join(folder, post.basename[:50]) + "*.txt")) > 0
+    with timed("exists_check_seconds"):
+        file_index = FileIndex.get_instance(folder)
+        exists = file_index.find(post.basename[:50], ".txt") is not None
     if not config.getboolean('General', 'overwrite_existing') and exists:
         if progress_tracker:
             progress_tracker.increment('text', 'skipped')
-        return
+        return True
 
     # print(f't: {tpath}')
 
@@ -721,31 +1178,359 @@ def text_save(post: Post):
             file.write("store_url: %s\n" % post.store_url)
         file.write("---\n\n")
         file.write(post.full_text)
+    file_index.add(tpath)
 
     if progress_tracker:
         progress_tracker.increment('text', 'downloaded')
+    return True
+
 
+MEDIA_HANDLERS = {
+    'photo': photo_save,
+    'video': video_save,
+    'text': text_save,
+}
 
-def parse_and_get(html_text: str) -> bool:
+
+def enqueue_media(media_type: str, post: Post):
     """
-    Parses the HTML and processes all found posts.
-    Returns True if posts were found, False if not.
+    Hand a post to the pool for the given media type. Blocks while that pool's queue
+    is full, which throttles page fetching to the speed of the downloads.
+    Falls back to saving inline when the pipeline is not running.
     """
-    soup = bs4.BeautifulSoup(html_text, "html.parser")
-    
-    posts = soup.select("div.mbsc-card.jffPostClass")
-    if not posts:
-        return False # No posts found
+    media_queue = media_queues.get(media_type)
+    if media_queue is None:
+        if post.ticket:
+            post.ticket.add()
+        ok = False
+        try:
+            ok = MEDIA_HANDLERS[media_type](post)
+        finally:
+            if post.ticket:
+                post.ticket.finish(ok)
+        return
 
-    post_count = 0
-    for pp in posts:
+    if post.ticket:
+        post.ticket.add()
+    while not abort_event.is_set():
         try:
-            if "donotremove" in pp.get("class"):
+            media_queue.put(post, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+QUEUE_ORDERS = ("fifo", "newest", "oldest", "smallest")
+
+
+def _post_timestamp(post: Post) -> Optional[float]:
+    try:
+        return datetime.datetime.fromisoformat(post.post_date_iso).timestamp()
+    except ValueError:
+        return None
+
+
+def estimated_size(post: Post) -> int:
+    """Rough relative size of a post's media: gallery images for photos, quality rank for videos."""
+    if post.type == "photo":
+        return len(post.card.select("div.imageGallery.galleryLarge img.expandable")) or 1
+    if post.type == "video":
+        video_block = post.card.select("div.videoBlock a")
+        if video_block:
+            try:
+                return {"540p": 1, "1080p": 2, "All": 3}.get(video_info(video_block[0])[1], 2)
+            except (ValueError, IndexError, KeyError):
+                pass
+        return 2
+    return 0
+
+
+def media_priority(order: str):
+    """Sort key for the media queues: lower keys are downloaded first. Posts without a date go last."""
+    if order == "newest":
+        return lambda post: -(_post_timestamp(post) or -math.inf)
+    if order == "oldest":
+        return lambda post: _post_timestamp(post) or math.inf
+    if order == "smallest":
+        return estimated_size
+    return lambda post: 0
+
+
+class MediaQueue(queue.PriorityQueue):
+    """
+    Bounded queue of posts for one media pool, handed out in key order (ties in arrival
+    order). The None stop sentinel sorts after every post.
+    """
+
+    def __init__(self, maxsize: int, key):
+        super().__init__(maxsize)
+        self._key = key
+        self._arrival = itertools.count()
+
+    def put(self, post: Optional[Post], block: bool = True, timeout: Optional[float] = None):
+        key = math.inf if post is None else self._key(post)
+        super().put((key, next(self._arrival), post), block, timeout)
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Optional[Post]:
+        return super().get(block, timeout)[2]
+
+
+def media_worker(media_type: str):
+    """
+    Media pool thread target. Consumes posts until it receives the None sentinel.
+    """
+    thread_name = threading.current_thread().name
+    handler = MEDIA_HANDLERS[media_type]
+    media_queue = media_queues[media_type]
+
+    while True:
+        post = media_queue.get()
+        ok = False
+        try:
+            if post is None:
+                break
+            if abort_event.is_set():
+                # Ctrl-C: empty the queue quickly so producers and shutdown are not blocked
+                continue
+            ok = handler(post)
+        except Exception:
+            with print_lock:
+                import traceback
+                print(traceback.format_exc())
+        finally:
+            if post is not None and post.ticket:
+                post.ticket.finish(ok)
+            media_queue.task_done()
+
+    if progress_tracker:
+        progress_tracker.clear_activity(thread_name)
+
+
+def log_concurrency(message: str):
+    with print_lock:
+        print(message)
+
+
+def start_adaptive_limits():
+    """Create the adaptive concurrency limits from the [Concurrency] config (if enabled)."""
+    if not config.getboolean('Concurrency', 'adaptive', fallback=False):
+        return
+    initial = {
+        'page': config.getint('General', 'max_workers', fallback=4),
+        'fragments': config.getint('General', 'concurrent_fragments', fallback=4),
+    }
+    for name, start in initial.items():
+        adaptive_limits[name] = AdaptiveLimit(
+            name,
+            initial=start,
+            minimum=config.getint('Concurrency', f'{name}_min', fallback=1),
+            maximum=config.getint('Concurrency', f'{name}_max', fallback=max(start, 1)),
+            window=config.getint('Concurrency', f'{name}_window', fallback=20),
+            error_threshold=config.getfloat('Concurrency', 'error_threshold', fallback=0.1),
+            latency_factor=config.getfloat('Concurrency', 'latency_factor', fallback=2.0),
+            log=log_concurrency,
+        )
+
+
+def start_metrics(tracker: ProgressTracker) -> list:
+    """
+    Attach live metrics to the tracker and start the exporters enabled in [Metrics].
+    Returns the exporters, each with a stop() method.
+    """
+    if not config.getboolean('Metrics', 'enabled', fallback=False):
+        return []
+    metrics = Metrics("jffscraper")
+    metrics.define("pages_fetched_total", "counter", "Feed pages fetched and parsed")
+    metrics.define("page_fetch_seconds", "histogram", "Feed page request latency")
+    metrics.define("posts_parsed_total", "counter", "Posts parsed from feed pages")
+    metrics.define("posts_filtered_total", "counter", "Parsed posts skipped by the post filter")
+    metrics.define("media_total", "counter", "Media items by type and outcome")
+    metrics.define("downloaded_bytes_total", "counter", "Bytes downloaded by media type")
+    metrics.define(
+        "download_throughput_bytes_per_second", "histogram", "Throughput of each finished download",
+        buckets=THROUGHPUT_BUCKETS,
+    )
+    metrics.define("license_fetch_seconds", "histogram", "Video license request latency")
+    metrics.define(
+        "dedupe_bytes_total", "counter",
+        "Media bytes deduplicated (reused: not downloaded again, linked: stored once)",
+    )
+    metrics.define("ffmpeg_seconds", "histogram", "ffmpeg post-processing duration by stage")
+    metrics.define("db_write_seconds", "histogram", "Database write-behind batch commit duration")
+    metrics.define("db_write_rows_total", "counter", "Rows committed by the database writers")
+    metrics.define(
+        "queue_depth", "gauge", "Items waiting in the media and database write queues", label="queue",
+        callback=lambda: {
+            **{media_type: media_queue.qsize() for media_type, media_queue in media_queues.items()},
+            'db': Database.pending_writes(),
+        },
+    )
+    metrics.define(
+        "concurrency_limit", "gauge", "Current adaptive concurrency limit", label="class",
+        callback=lambda: {name: limit.limit for name, limit in adaptive_limits.items()},
+    )
+
+    tracker.metrics = metrics
+
+    exporters = []
+    port = config.getint('Metrics', 'port', fallback=9464)
+    if port:
+        bind = config.get('Metrics', 'bind', fallback='127.0.0.1') or '127.0.0.1'
+        try:
+            server = MetricsServer(metrics, port, bind)
+            exporters.append(server)
+            print(f"Serving metrics on http://{server.address[0]}:{server.address[1]}/metrics")
+        except OSError as e:
+            print(f"Warning: Could not start the metrics endpoint on {bind}:{port}: {e}")
+    json_path = config.get('Metrics', 'json_path', fallback='')
+    if json_path:
+        exporters.append(MetricsFileWriter(metrics, json_path, config.getfloat('Metrics', 'json_interval', fallback=10)))
+        print(f"Writing metrics to {json_path}")
+    return exporters
+
+
+def start_media_pools():
+    """Create the per-type queues and start their worker pools."""
+    global gallery_executor
+    queue_size = max(config.getint('General', 'queue_size', fallback=100), 1)
+    order = config.get('Scheduler', 'order', fallback='fifo').strip().lower()
+    if order not in QUEUE_ORDERS:
+        print(f"Warning: Unknown [Scheduler] order {order!r}, using fifo")
+        order = "fifo"
+    priority = media_priority(order)
+    pool_sizes = {
+        'photo': config.getint('General', 'photo_workers', fallback=4),
+        'video': config.getint('General', 'video_workers', fallback=2),
+        'text': config.getint('General', 'text_workers', fallback=1),
+    }
+    for media_type, workers in pool_sizes.items():
+        workers = max(workers, 1)
+        media_queues[media_type] = MediaQueue(queue_size, priority)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=media_type)
+        for _ in range(workers):
+            executor.submit(media_worker, media_type)
+        media_executors[media_type] = (executor, workers)
+
+    gallery_workers = max(config.getint('General', 'gallery_workers', fallback=4), 1)
+    gallery_executor = concurrent.futures.ThreadPoolExecutor(max_workers=gallery_workers, thread_name_prefix="gallery")
+
+
+def stop_media_pools():
+    """Signal every media worker to finish its queue and wait for the pools to exit."""
+    global gallery_executor
+    for media_type, (executor, workers) in media_executors.items():
+        for _ in range(workers):
+            media_queues[media_type].put(None)
+    for executor, _ in media_executors.values():
+        executor.shutdown(wait=True)
+    media_executors.clear()
+    media_queues.clear()
+
+    if gallery_executor:
+        gallery_executor.shutdown(wait=True)
+        gallery_executor = None
+
+
+def postprocess_pool_size() -> int:
+    """
+    [General] postprocess_workers: a number, or auto. ffmpeg only copies streams, so the work
+    is mostly disk bound; auto runs one job per two CPUs, at most 4. 0 disables the pool.
+    """
+    value = config.get('General', 'postprocess_workers', fallback='auto').strip().lower()
+    if value in ('', 'auto'):
+        return max(1, min(4, (os.cpu_count() or 2) // 2))
+    return max(int(value), 0)
+
+
+def start_bandwidth_limit():
+    """Cap the download bandwidth of photos and videos as set in [Scheduler] (nothing to do when unlimited)."""
+    global bandwidth_limiter
+    mb = 1024 ** 2
+    rate = config.getfloat('Scheduler', 'max_rate', fallback=0.0) * mb
+    try:
+        schedule = [
+            (start, end, entry_rate * mb)
+            for start, end, entry_rate in parse_schedule(config.get('Scheduler', 'rate_schedule', fallback=''))
+        ]
+    except ValueError as e:
+        print(f"Warning: Ignoring [Scheduler] rate_schedule: {e}")
+        schedule = []
+    if not rate and not any(entry_rate for _, _, entry_rate in schedule):
+        return
+    lanes = tuple(
+        media_type.strip() for media_type in
+        config.get('Scheduler', 'type_priority', fallback='photo, video').split(",") if media_type.strip()
+    )
+    bandwidth_limiter = BandwidthLimiter(
+        rate, schedule, lanes, config.getfloat('Scheduler', 'background_share', fallback=0.2),
+    )
+    # direct_download fetches the photos
+    direct_download.throttle = lambda nbytes: bandwidth_limiter.consume(nbytes, 'photo')
+    current = bandwidth_limiter.current_rate()
+    profiles = f" ({len(schedule)} time-of-day profiles)" if schedule else ""
+    if current:
+        print(f"Download bandwidth capped at {current / mb:.1f} MB/s{profiles}")
+    else:
+        print(f"Download bandwidth not capped at this time of day{profiles}")
+
+
+def start_postprocess_pool():
+    """Start the video post-processing pool, with a backlog of two waiting videos per worker."""
+    global postprocess_executor, postprocess_slots
+    workers = postprocess_pool_size()
+    if workers == 0:
+        return
+    postprocess_slots = threading.BoundedSemaphore(workers * 3)
+    postprocess_executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="postprocess")
+
+
+def stop_postprocess_pool():
+    """Wait for every handed-off video to be processed and stop the pool."""
+    global postprocess_executor
+    if postprocess_executor:
+        postprocess_executor.shutdown(wait=True)
+        postprocess_executor = None
+
+
+def parse_posts(html_text: str, feed: Optional['Feed'] = None) -> list[Post]:
+    """
+    Parses the HTML and records every found post that passes the post filter in its uploader's
+    database. Returns all posts, filtered ones included (empty if the page has none).
+    feed gets the incremental mode and date window bookkeeping.
+    """
+    with timed("parse_seconds"):
+        posts = _parse_posts(html_text, feed)
+
+    # Track posts found
+    if progress_tracker and posts:
+        filtered = sum(1 for post in posts if post.filtered)
+        if filtered < len(posts):
+            progress_tracker.add_posts(len(posts) - filtered)
+        if filtered:
+            progress_tracker.add_filtered(filtered)
+
+    return posts
+
+
+def _parse_posts(html_text: str, feed: Optional['Feed']) -> list[Post]:
+    cards = get_html_parser().parse_cards(html_text)
+
+    posts = []
+    for pp in cards:
+        try:
+            if "donotremove" in pp.classes:
                 # Skip "Whom To Follow"
                 continue
 
             post = Post(pp)
-            post_count += 1
+            posts.append(post)
+
+            if post_filter and not post_filter.matches(post):
+                post.filtered = True
+                # Pinned posts stay at the top of the feed, so only the others show how far back it has gone
+                if feed and not post.pinned and post_filter.before_window(post):
+                    feed.passed_date_window()
+                continue
 
             # Set uploader_id on first post
             if progress_tracker:
@@ -754,181 +1539,1008 @@ def parse_and_get(html_text: str) -> bool:
             # Insert post into database
             try:
                 db = get_db(post.uploader_id)
-                raw_html = str(pp) if config.getboolean('Database', 'store_raw_html', fallback=True) else None
-                post.db_id = db.insert_post(post, raw_html=raw_html)
+                # Pinned posts stay at the top of the feed, so they say nothing about where new content ends
+                if feed and config.getboolean('General', 'incremental', fallback=False) and not post.pinned:
+                    feed.note_archived_post(db.get_post_id(post.pid) is not None)
+                raw_html = pp.html if config.getboolean('Database', 'store_raw_html', fallback=True) else None
+                db.insert_post(post, raw_html=raw_html)
+                post.in_db = True
             except Exception as e:
                 with print_lock:
                     print(f"Warning: Failed to save post {post.pid} to database: {e}")
-                post.db_id = None
+                post.in_db = False
 
-            if post.type == "shoutout":
-                # Skip "Shoutout Post"
-                continue
-            elif post.type == "video":
-                video_save(post)
-                if config.getboolean('General', 'save_full_text'):
-                    text_save(post)
-            elif post.type == "photo":
-                photo_save(post)
-                if config.getboolean('General', 'save_full_text'):
-                    text_save(post)
-            elif post.type == "text":
-                if config.getboolean('General', 'save_full_text'):
-                    text_save(post)
-
-            if post.post_date == "Unknown Date":
+            if post.type != "shoutout" and post.post_date == "Unknown Date":
                 with print_lock:
                     print("================================")
                     print("[WARN] Unknown Date")
-                    print(pp.prettify())
+                    print(pp.html)
                     print("================================")
 
         except KeyboardInterrupt:
-            stop_event.set() # Signal stop
+            if feed:
+                feed.scraper.stop_event.set() # Signal stop
             sys.exit(0)
         except Exception:
             with print_lock:
                 print("================================")
-                print(pp.prettify())
+                print(pp.html)
                 import traceback
 
                 print(traceback.format_exc())
                 print("================================")
-    
-    # Track posts found
-    if progress_tracker and post_count > 0:
-        progress_tracker.add_posts(post_count)
 
-    return post_count > 0 # Return True if we found any posts
+    return posts
 
 
-def get_html(loopct: int) -> str:
-    geturl = ""
-    if poster_id != "":
-        geturl = config.get('API', 'api_url_poster').format(
-            hash=user_hash, poster_id=poster_id, seq=loopct,
-        )
-    else:
-        geturl = config.get('API', 'api_url').format(
-            hash=user_hash, seq=loopct,
+def dispatch_post(post: Post):
+    """Hand a parsed post to the media pools for its type."""
+    if post.filtered:
+        return
+    if post.type == "shoutout":
+        # Skip "Shoutout Post"
+        return
+    elif post.type in ("video", "photo"):
+        enqueue_media(post.type, post)
+        if config.getboolean('General', 'save_full_text'):
+            enqueue_media('text', post)
+    elif post.type == "text":
+        if config.getboolean('General', 'save_full_text'):
+            enqueue_media('text', post)
+
+
+def parse_and_get(html_text: str, feed: Optional['Feed'] = None, ticket: Optional['PageTicket'] = None) -> bool:
+    """
+    Parses the HTML and processes all found posts (in replay mode only parses and stores them).
+    Returns True if posts were found, False if not. The posts' media jobs are counted on ticket.
+    """
+    posts = parse_posts(html_text, feed)
+    if ticket:
+        ticket.posts = len(posts)
+    if not replay_mode:
+        for post in posts:
+            post.ticket = ticket
+            dispatch_post(post)
+    return len(posts) > 0 # Return True if we found any posts
+
+
+class PageError(Exception):
+    """A page could not be fetched (after the HTTP client's own retries)."""
+
+
+class Feed:
+    """
+    Crawl state of one feed - the subscriptions feed, or one poster's profile: the next page
+    offset, failed pages waiting for another attempt, and whether the end has been reached.
+    """
+
+    def __init__(self, scraper: 'Scraper', poster_id: str = ""):
+        self.scraper = scraper
+        self.poster_id = poster_id
+        self.done = threading.Event()  # End of the feed seen (or incremental stop)
+        self._lock = threading.Lock()
+        self._next_offset = 0
+        # Pages whose fetch failed: offsets waiting to be fetched again, failure counts, and pages given up on
+        self._retry_offsets: collections.deque[int] = collections.deque()
+        self._page_failures: dict[int, int] = {}
+        self.lost_offsets: list[int] = []
+        # Resume: offsets finished by the interrupted run, skipped when paging
+        self._finished_offsets: set[int] = set()
+        # Incremental mode: run of consecutive already-archived posts seen while paging
+        self._known_streak = 0
+
+    @property
+    def name(self) -> str:
+        """The poster ID, or "home" for the subscriptions feed (also the page cache key)."""
+        return self.poster_id or "home"
+
+    def page_url(self, loopct: int) -> str:
+        """Build the getPosts.php URL for a page offset."""
+        if self.poster_id != "":
+            return config.get('API', 'api_url_poster').format(
+                hash=self.scraper.user_hash, poster_id=self.poster_id, seq=loopct,
+            )
+        return config.get('API', 'api_url').format(
+            hash=self.scraper.user_hash, seq=loopct,
         )
 
+    def resume(self, finished_offsets: set[int]):
+        """Continue an interrupted crawl: page from the lowest unfinished offset, skipping finished ones."""
+        with self._lock:
+            self._finished_offsets = set(finished_offsets)
+            while self._next_offset in self._finished_offsets:
+                self._next_offset += 10
+        with print_lock:
+            print(
+                f"Resuming {self.name}: {len(finished_offsets)} pages already done, "
+                f"continuing from offset {self._next_offset}"
+            )
+
+    def next_offset(self) -> Optional[int]:
+        """
+        The next page offset to fetch. Offsets of failed pages come first; once the end of
+        the feed has been seen only those are handed out, then None.
+        """
+        with self._lock:
+            if self._retry_offsets:
+                return self._retry_offsets.popleft()
+            if self.done.is_set():
+                return None
+            offset = self._next_offset
+            self._next_offset += 10
+            while self._next_offset in self._finished_offsets:
+                self._next_offset += 10
+            return offset
+
+    def page_finished(self, offset: int, posts: int):
+        """Every post and media job of the page at offset has been processed."""
+        if self.scraper.journal:
+            self.scraper.journal.mark_done(self.name, offset, posts)
+
+    def requeue(self, offset: int):
+        """Put a failed page back in line, up to page_retries times; after that it is reported as lost."""
+        with self._lock:
+            failures = self._page_failures.get(offset, 0) + 1
+            self._page_failures[offset] = failures
+            if failures <= config.getint('HTTP', 'page_retries', fallback=5):
+                self._retry_offsets.append(offset)
+                return
+            self.lost_offsets.append(offset)
+        with print_lock:
+            print(f"Giving up on page at offset {offset} of {self.name} after {failures} attempts")
+
+    def note_archived_post(self, known: bool):
+        """
+        Incremental mode bookkeeping. Counts consecutive posts that are already in the
+        database and ends the feed once the configured threshold is hit.
+        """
+        threshold = max(config.getint('General', 'incremental_stop_after', fallback=10), 1)
+        with self._lock:
+            if not known:
+                self._known_streak = 0
+                return
+            self._known_streak += 1
+            streak = self._known_streak
+        if streak >= threshold and not self.done.is_set():
+            self.done.set()
+            with print_lock:
+                print(f"Incremental mode: {streak} archived posts in a row, stopping crawl of {self.name}.")
+
+    def passed_date_window(self):
+        """A non-pinned post older than the filter's start date: every later page is older still."""
+        if not self.done.is_set():
+            self.done.set()
+            with print_lock:
+                print(f"Date filter: reached posts before {post_filter.date_from}, stopping crawl of {self.name}.")
+
+    def _newer_than(self, offset: int, date_to) -> bool:
+        """True if every non-pinned post on the page at offset is newer than date_to (False past the end)."""
+        html_text = get_html(self, offset)
+        if html_text is None or "as sad as you are" in html_text:
+            return False
+        dates = [
+            post_filter.post_date(post)
+            for post in (Post(card) for card in get_html_parser().parse_cards(html_text) if "donotremove" not in card.classes)
+            if not post.pinned
+        ]
+        dates = [date for date in dates if date is not None]
+        return bool(dates) and min(dates) > date_to
+
+    def seek_date_window(self, date_to):
+        """
+        Start paging at the first page that reaches back to date_to, skipping the newer ones.
+        The feed is newest by post date first: offsets are probed at doubling steps, then
+        bisected, so a backfill costs a few page fetches instead of every page in between.
+        Only for a post-date window (PostFilter.follows_feed_order).
+        """
+        probes = 1
+        if not self._newer_than(0, date_to):
+            return
+        low, step = 0, 10
+        while True:
+            high = low + step
+            probes += 1
+            if not self._newer_than(high, date_to):
+                break
+            low, step = high, step * 2
+        # The page at low is entirely newer than date_to, the one at high is not
+        while high - low > 10:
+            middle = low + (high - low) // 20 * 10
+            probes += 1
+            if self._newer_than(middle, date_to):
+                low = middle
+            else:
+                high = middle
+        with self._lock:
+            self._next_offset = max(self._next_offset, high)
+            while self._next_offset in self._finished_offsets:
+                self._next_offset += 10
+            offset = self._next_offset
+        with print_lock:
+            print(f"Date filter: starting {self.name} at offset {offset} ({probes} pages probed)")
+
+
+class PageTicket:
+    """
+    Outstanding work of one fetched page: its own parsing plus every media job its posts
+    queued. Every job finishes with its outcome; when the last one does, the page is
+    recorded in the crawl journal unless a job failed (or was dropped on Ctrl-C), so a page
+    with missing media stays unfinished and is fetched again on resume.
+    """
+
+    def __init__(self, feed: Feed, offset: int):
+        self.feed = feed
+        self.offset = offset
+        self.posts = 0
+        self.failed = False
+        self._pending = 1  # The page itself, finished once its posts are dispatched
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self._pending += 1
+
+    def finish(self, ok: bool = True):
+        with self._lock:
+            self._pending -= 1
+            self.failed = self.failed or not ok
+            done = self._pending == 0 and not self.failed
+        if done:
+            self.feed.page_finished(self.offset, self.posts)
+
+
+def cached_html(feed: Feed, loopct: int) -> tuple[bool, Optional[str]]:
+    """
+    Look a page up in the page cache. Returns (hit, html); in replay mode every lookup
+    counts as a hit, with html None once the cached pages run out.
+    """
+    if page_cache is None:
+        return False, None
+    html_text = page_cache.get(feed.name, loopct, max_age=None if replay_mode else -1)
+    return (html_text is not None or replay_mode), html_text
+
+
+def get_html(feed: Feed, loopct: int) -> Optional[str]:
+    hit, html_text = cached_html(feed, loopct)
+    if hit:
+        return html_text
+
+    geturl = feed.page_url(loopct)
+    limit = adaptive_limits.get('page')
+    start = time.monotonic()
+
     try:
-        html_text = scraper.get(geturl).text
+        response = get_http_pool().get(geturl)
+    except:
+        if limit:
+            limit.record(time.monotonic() - start, ok=False)
+        print(f"Error fetching URL: {geturl}")
+        raise
+    if limit:
+        limit.record(time.monotonic() - start, ok=response.status_code < 400, nbytes=len(response.content))
+    if progress_tracker:
+        progress_tracker.observe("page_fetch_seconds", time.monotonic() - start)
+    # An error page has no posts and would otherwise read as the end of the feed
+    if response.status_code != 200:
+        raise PageError(f"HTTP {response.status_code} for {geturl}")
+    if page_cache:
+        page_cache.put(feed.name, loopct, response.text)
+    return response.text
+
+
+# --- asyncio engine ---
+# Same pages, files and database rows as the threaded engine, but page, photo and license
+# requests run as coroutines on one curl_cffi AsyncSession. Parsing, text files and the
+# yt-dlp/ffmpeg video pipeline stay blocking and run in worker threads.
+
+async def async_get_html(session, feed: Feed, loopct: int) -> str:
+    hit, html_text = await asyncio.to_thread(cached_html, feed, loopct)
+    if hit:
         return html_text
+
+    geturl = feed.page_url(loopct)
+    start = time.monotonic()
+
+    try:
+        response = await get_http_pool().async_get(session, geturl)
     except:
         print(f"Error fetching URL: {geturl}")
         raise
+    if progress_tracker:
+        progress_tracker.observe("page_fetch_seconds", time.monotonic() - start)
+    if response.status_code != 200:
+        raise PageError(f"HTTP {response.status_code} for {geturl}")
+    if page_cache:
+        await asyncio.to_thread(page_cache.put, feed.name, loopct, response.text)
+    return response.text
+
+
+async def async_fetch_license(session, license_url: str) -> str:
+    """Fetch the decryption key for a video. Returns it hex encoded."""
+    start = time.monotonic()
+    response = await get_http_pool().async_get(session, license_url)
+    if progress_tracker:
+        progress_tracker.observe("license_fetch_seconds", time.monotonic() - start)
+    return license_key(license_url, response)
 
-# --- Thread-safe offset getter ---
-def get_next_offset() -> int:
-    """Fetches the next page offset in a thread-safe way."""
-    global current_offset
-    with offset_lock:
-        offset = current_offset
-        current_offset += 10  # Increment for the next thread
-        return offset
 
-# --- Worker function for dynamic threading ---
-def process_page_worker():
+async def async_direct_download(session, url: str, path: str):
     """
-    Worker thread target. Continuously fetches and processes pages until the stop_event is set.
+    Download url to path through <path>.tmp, resuming a leftover .tmp with a Range request
+    and validating the size before the rename. Segmented downloads are left to the
+    threaded engine (direct_download), which also finishes any interrupted ones.
+    Failures are retried with the HTTP pool's retry policy, resuming each time.
+    Returns (final file size, SHA-256 hex digest) like direct_download.download.
     """
-    thread_name = threading.current_thread().name
+    pool = get_http_pool()
+    attempt = 0
+    while True:
+        try:
+            return await _async_direct_download_once(session, url, path)
+        except (direct_download.DownloadError, RequestException) as e:
+            if attempt >= pool.retry.retries or not getattr(e, 'retryable', True):
+                raise
+            await asyncio.sleep(pool.retry.delay(attempt, getattr(e, 'retry_after', None)))
+            pool.stats[pool.host_class(url)].record_retry()
+            attempt += 1
 
-    while not stop_event.is_set():
-        loopct = get_next_offset()
 
-        if progress_tracker:
-            progress_tracker.set_activity(thread_name, f"Fetching page {loopct}...")
+def _tmp_state(tmp_path: str) -> tuple[bool, int]:
+    """(segmented download in progress, bytes already in the .tmp) for a download's .tmp file."""
+    segmented = os.path.exists(tmp_path + ".parts")
+    return segmented, os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
 
-        try:
-            html_text = get_html(loopct)
 
-            if "as sad as you are" in html_text:
-                stop_event.set()  # Signal all other threads to stop
-                break  # Exit this thread's loop
-            else:
-                # Track page processed
+async def _async_direct_download_once(session, url: str, path: str) -> tuple[int, str]:
+    """
+    One attempt of async_direct_download. The file is opened, written and renamed on worker
+    threads, with the body gathered into BUFFER_SIZE writes, so the event loop only waits
+    on the network.
+    """
+    pool = get_http_pool()
+    tmp_path = path + ".tmp"
+    segmented, offset = await asyncio.to_thread(_tmp_state, tmp_path)
+    if segmented:
+        return await asyncio.to_thread(direct_download.download, pool, url, path, **direct_download_options())
+
+    digest = hashlib.sha256()  # Streamed when the body starts at byte 0
+    headers = {"Range": f"bytes={offset}-"} if offset else None
+    restart = False
+    await pool.async_pace(url)
+    async with session.stream("GET", url, headers=headers) as response:
+        pool.record(url, response)
+        if offset and response.status_code == 416:
+            # The .tmp is complete only if it is exactly the remote size
+            _, total = direct_download.content_range(response.headers.get("Content-Range"))
+            if total != offset:
+                restart = True
+            expected = offset
+        elif response.status_code in (200, 206):
+            if response.status_code == 200:
+                offset = 0
+            length = response.headers.get("Content-Length")
+            expected = offset + int(length) if length and length.isdigit() else None
+            out_file = await asyncio.to_thread(open, tmp_path, "ab" if offset else "wb", buffering=0)
+            try:
+                buffer = bytearray()
+                async for chunk in response.aiter_content():
+                    buffer += chunk
+                    if not offset:
+                        digest.update(chunk)
+                    if len(buffer) >= direct_download.BUFFER_SIZE:
+                        full, buffer = buffer, bytearray()
+                        await asyncio.to_thread(out_file.write, full)
+                    if bandwidth_limiter:
+                        delay = bandwidth_limiter.reserve(len(chunk), 'photo')
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                if buffer:
+                    await asyncio.to_thread(out_file.write, buffer)
+            finally:
+                await asyncio.to_thread(out_file.close)
+        else:
+            pool.retry_delay(url, response, 0)  # pauses the host class on a 429
+            raise direct_download.status_error(pool, response, url)
+
+    if restart:
+        # Stale or oversized leftover: start over from byte 0
+        await asyncio.to_thread(os.truncate, tmp_path, 0)
+        return await _async_direct_download_once(session, url, path)
+
+    size = await asyncio.to_thread(os.path.getsize, tmp_path)
+    if expected is not None and size != expected:
+        raise direct_download.DownloadError(f"Size mismatch for {url}: got {size} bytes, expected {expected}")
+    if not offset and response.status_code in (200, 206):
+        sha256 = digest.hexdigest()
+    else:
+        sha256 = await asyncio.to_thread(direct_download.file_sha256, tmp_path)
+    await asyncio.to_thread(os.replace, tmp_path, path)
+    return size, sha256
+
+
+async def _async_photo_save_item(session, limit: asyncio.Semaphore,
+                                 post: Post, folder: str, db: Database, i: int, imgsrc: str) -> str:
+    """Download a single gallery image. Returns 'downloaded', 'skipped' or 'failed'."""
+    # The existence checks, deduplication and database updates touch the disk: keep them off the loop
+    ppath = await asyncio.to_thread(_photo_prepare, post, folder, db, i, imgsrc)
+    if ppath is None:
+        return 'skipped'
+
+    try:
+        async with limit:
+            start = time.monotonic()
+            _, sha256 = await async_direct_download(session, imgsrc, ppath)
+            elapsed = time.monotonic() - start
+        await asyncio.to_thread(_photo_finish, post, folder, db, imgsrc, ppath, elapsed, sha256)
+        return 'downloaded'
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        import traceback
+        with print_lock:
+            print(traceback.format_exc())
+        return 'failed'
+
+
+async def async_photo_save(session, limit: asyncio.Semaphore, post: Post) -> bool:
+    activity = f"photo-{post.pid}"
+    if progress_tracker:
+        progress_tracker.set_activity(activity, f"Photo: {post.basename[:50]}")
+
+    folder = await asyncio.to_thread(create_folder, post)
+    db = await asyncio.to_thread(get_db, post.uploader_id)
+    statuses = await asyncio.gather(*(
+        _async_photo_save_item(session, limit, post, folder, db, i, imgsrc)
+        for i, imgsrc in photo_items(post)
+    ))
+    report_photo_statuses(statuses)
+
+    if progress_tracker:
+        progress_tracker.clear_activity(activity)
+    return 'failed' not in statuses
+
+
+def video_already_saved(post: Post) -> bool:
+    """True when video_save would skip the post because its video is already on disk."""
+    if config.getboolean('General', 'overwrite_existing'):
+        return False
+    file_index = FileIndex.get_instance(create_folder(post))
+    return file_index.find_pid(post.pid, ".ytdl") is None and file_index.find_pid(post.pid, ".mp4") is not None
+
+
+def _stored_key(post: Post, url: str, kid: str) -> tuple[Optional[str], bool]:
+    """(stored decryption key for kid or None, whether the video was downloaded before for another post)."""
+    hex_key = get_db(post.uploader_id).get_decryption_key(kid)
+    return hex_key, hex_key is None and bool(media_index and media_index.find_url(url))
+
+
+async def async_video_save(session, limits: dict[str, asyncio.Semaphore], post: Post) -> bool:
+    async with limits['video']:
+        hex_key = None
+        video_block = post.card.select("div.videoBlock a")
+        # Videos already on disk are skipped by video_save without a key
+        if video_block and not await asyncio.to_thread(video_already_saved, post):
+            try:
+                url, _, license_url, kid = video_info(video_block[0])
+                hex_key, copied = await asyncio.to_thread(_stored_key, post, url, kid)
+                # A video downloaded before for another post is reused by video_save without a key
+                if hex_key is None and not copied:
+                    async with limits['license']:
+                        hex_key = await async_fetch_license(session, license_url)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # video_save reports the failure when it retries the license itself
+        return await asyncio.to_thread(video_save, post, hex_key)
+
+
+# --- Crawl engine ---
+
+class Scraper:
+    """
+    Crawl engine for one or more feeds: the subscriptions feed, or one feed per poster ID.
+    Page workers take pages from the feeds in turn (round-robin) and hand the posts to the
+    process-wide media pools, so every feed shares the HTTP and download pools fairly.
+
+        config.read('config.ini')
+        Scraper(user_hash, ["poster1", "poster2"]).run()
+
+    One Scraper runs at a time per process; its tracker receives the media progress.
+    With a journal, finished pages are recorded per feed; resume=True continues the feeds'
+    interrupted runs from their lowest unfinished offset instead of starting at 0.
+    """
+
+    def __init__(
+        self,
+        user_hash: str,
+        poster_ids: Iterable[str] = (),
+        tracker: Optional[ProgressTracker] = None,
+        journal: Optional[CrawlJournal] = None,
+        resume: bool = False,
+    ):
+        self.user_hash = user_hash
+        self.feeds = [Feed(self, pid) for pid in poster_ids if pid] or [Feed(self)]
+        self.tracker = tracker if tracker is not None else ProgressTracker()
+        self.journal = journal
+        self.resume = resume
+        self.stop_event = threading.Event()  # Stop every feed (Ctrl-C)
+        self._turn = 0
+        self._turn_lock = threading.Lock()
+
+    @property
+    def lost_pages(self) -> dict[str, list[int]]:
+        """Offsets of pages that could not be fetched, per feed name."""
+        return {feed.name: sorted(feed.lost_offsets) for feed in self.feeds if feed.lost_offsets}
+
+    def next_page(self) -> Optional[tuple[Feed, int]]:
+        """
+        The next (feed, offset) to fetch, taking the unfinished feeds in turn.
+        None once every feed is finished or the run is stopped.
+        """
+        if self.stop_event.is_set() or abort_event.is_set():
+            return None
+        with self._turn_lock:
+            for i in range(len(self.feeds)):
+                feed = self.feeds[(self._turn + i) % len(self.feeds)]
+                offset = feed.next_offset()
+                if offset is not None:
+                    self._turn = (self._turn + i + 1) % len(self.feeds)
+                    return feed, offset
+        return None
+
+    def run(self, engine: Optional[str] = None):
+        """Crawl every feed to its end with the given (or configured) engine: threaded or async."""
+        global progress_tracker
+        progress_tracker = self.tracker
+        if engine is None:
+            engine = config.get('General', 'engine', fallback='threaded').strip().lower()
+        if self.journal:
+            for feed in self.feeds:
+                finished_offsets = self.journal.begin(feed.name, self.resume)
+                if finished_offsets is not None:
+                    feed.resume(finished_offsets)
+                elif self.resume:
+                    with print_lock:
+                        print(f"Nothing to resume for {feed.name}, starting from the first page")
+        if post_filter and post_filter.date_to and post_filter.follows_feed_order and not replay_mode:
+            for feed in self.feeds:
+                try:
+                    feed.seek_date_window(post_filter.date_to)
+                except (PageError, RequestException) as e:
+                    with print_lock:
+                        print(f"Date filter: could not seek in {feed.name} ({e}), paging from the start")
+
+        if engine == "async":
+            self.run_async()
+        else:
+            self.run_threaded(max(config.getint('General', 'max_workers', fallback=4), 1))
+
+        if self.journal and not (self.stop_event.is_set() or abort_event.is_set()):
+            for feed in self.feeds:
+                # Crawled to the end with nothing left behind: the next resume starts over
+                if feed.done.is_set() and not feed.lost_offsets:
+                    self.journal.finish(feed.name)
+
+    # --- Threaded engine ---
+
+    def process_page_worker(self):
+        """
+        Worker thread target. Continuously fetches and processes pages until every feed is done.
+        """
+        thread_name = threading.current_thread().name
+
+        while True:
+            # Only `limit` page workers are active at a time when adaptive concurrency is on
+            with Slot(adaptive_limits.get('page'), abort_event) as slot:
+                page = self.next_page() if slot.acquired else None
+                if page is None:
+                    break
+                feed, loopct = page
+
                 if progress_tracker:
-                    progress_tracker.increment_page()
+                    progress_tracker.set_activity(thread_name, f"Fetching page {loopct} of {feed.name}...")
 
-                # parse_and_get returns True if posts were found, False if not
-                if not parse_and_get(html_text):
-                    # This can happen on empty pages at the end
-                    stop_event.set()
+                try:
+                    html_text = get_html(feed, loopct)
+                except KeyboardInterrupt:
+                    self.stop_event.set()
+                    break
+                except Exception:
+                    with print_lock:
+                        import traceback
+                        print(traceback.format_exc())
+                    # Don't lose the page: it goes back in line for another attempt
+                    feed.requeue(loopct)
+                    continue
+
+                try:
+                    # None: no more cached pages to replay
+                    if html_text is None or "as sad as you are" in html_text:
+                        feed.done.set()  # Other workers stop taking new pages from this feed
+                        continue
+                    else:
+                        # Track page processed
+                        if progress_tracker:
+                            progress_tracker.increment_page()
+
+                        # parse_and_get returns True if posts were found, False if not
+                        ticket = PageTicket(feed, loopct)
+                        if not parse_and_get(html_text, feed, ticket):
+                            # This can happen on empty pages at the end
+                            feed.done.set()
+                            continue
+                        ticket.finish()  # Every post is dispatched; media jobs finish the rest
+
+                except KeyboardInterrupt:
+                    self.stop_event.set()
                     break
+                except Exception:
+                    with print_lock:
+                        import traceback
+                        print(traceback.format_exc())
+                    # Don't stop on an individual page error, just get the next one
+                    continue
+
+        # Clear activity when thread exits
+        if progress_tracker:
+            progress_tracker.clear_activity(thread_name)
+
+    def run_threaded(self, max_workers: int):
+        """Crawl with the thread pool engine: page worker threads feeding the media pools."""
+        # Media pools start first so page workers can hand posts off immediately
+        start_postprocess_pool()
+        start_media_pools()
+
+        # With adaptive concurrency, start enough threads for the upper bound; the limit decides how many are active
+        if 'page' in adaptive_limits:
+            max_workers = adaptive_limits['page'].maximum
+
+        # --- Dynamic Thread Pool Executor ---
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page")
+        try:
+            # Submit one worker for each slot in the pool
+            futures = [executor.submit(self.process_page_worker) for _ in range(max_workers)]
+
+            # This will wait for all threads to complete
+            # Threads will complete when every feed is done and they finish their last job
+            concurrent.futures.wait(futures)
 
         except KeyboardInterrupt:
-            stop_event.set()
-            break
-        except Exception:
-            with print_lock:
-                import traceback
-                print(traceback.format_exc())
-            # Don't stop on an individual page error, just get the next one
-            continue
+            self.stop_event.set()
+            abort_event.set()
+        finally:
+            executor.shutdown(wait=True)
+            # Page workers are done producing; let the media pools finish what is queued
+            try:
+                stop_media_pools()
+                stop_postprocess_pool()
+            except KeyboardInterrupt:
+                abort_event.set()
+                stop_media_pools()
+                stop_postprocess_pool()
+
+    # --- asyncio engine ---
+
+    async def async_crawl(self):
+        """Crawl with the asyncio engine until the end of every feed."""
+        sizes = {
+            'page': config.getint('Async', 'page_concurrency', fallback=8),
+            'photo': config.getint('Async', 'photo_concurrency', fallback=64),
+            'license': config.getint('Async', 'license_concurrency', fallback=8),
+            'video': config.getint('General', 'video_workers', fallback=2),
+            'text': config.getint('General', 'text_workers', fallback=1),
+        }
+        sizes = {kind: max(size, 1) for kind, size in sizes.items()}
+        limits = {kind: asyncio.Semaphore(size) for kind, size in sizes.items()}
+        # Posts waiting for media, like queue_size in the threaded engine
+        pending = asyncio.Semaphore(max(config.getint('General', 'queue_size', fallback=100), 1))
+        media_tasks: set[asyncio.Task] = set()
+        max_clients = sizes['page'] + sizes['photo'] + sizes['license']
+
+        async def run_media(coro, ticket: Optional[PageTicket]):
+            ok = False
+            try:
+                ok = await coro
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                with print_lock:
+                    import traceback
+                    print(traceback.format_exc())
+            finally:
+                pending.release()
+                if ticket:
+                    ticket.finish(ok)
+
+        async def text_save_limited(post: Post) -> bool:
+            async with limits['text']:
+                return await asyncio.to_thread(text_save, post)
+
+        async def submit(coro, ticket: Optional[PageTicket]):
+            await pending.acquire()
+            if ticket:
+                ticket.add()
+            task = asyncio.create_task(run_media(coro, ticket))
+            media_tasks.add(task)
+            task.add_done_callback(media_tasks.discard)
+
+        async def page_worker():
+            save_text = config.getboolean('General', 'save_full_text')
+            while True:
+                page = self.next_page()
+                if page is None:
+                    break
+                feed, loopct = page
+                try:
+                    async with limits['page']:
+                        html_text = await async_get_html(session, feed, loopct)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    with print_lock:
+                        import traceback
+                        print(traceback.format_exc())
+                    feed.requeue(loopct)
+                    continue
+
+                try:
+                    if "as sad as you are" in html_text:
+                        feed.done.set()
+                        continue
+
+                    if progress_tracker:
+                        progress_tracker.increment_page()
+
+                    posts = await asyncio.to_thread(parse_posts, html_text, feed)
+                    if not posts:
+                        feed.done.set()
+                        continue
+
+                    ticket = PageTicket(feed, loopct)
+                    ticket.posts = len(posts)
+                    for post in posts:
+                        if post.filtered:
+                            continue
+                        post.ticket = ticket  # Videos handed to the post-processing pool add to it
+                        if post.type == "photo":
+                            await submit(async_photo_save(session, limits['photo'], post), ticket)
+                        elif post.type == "video":
+                            await submit(async_video_save(session, limits, post), ticket)
+                        if post.type in ("photo", "video", "text") and save_text:
+                            await submit(text_save_limited(post), ticket)
+                    ticket.finish()
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    with print_lock:
+                        import traceback
+                        print(traceback.format_exc())
+                    continue
+
+        async with get_http_pool().async_session(max_clients=max_clients) as session:
+            try:
+                await asyncio.gather(*(page_worker() for _ in range(sizes['page'])))
+                while media_tasks:
+                    await asyncio.gather(*list(media_tasks))
+            except asyncio.CancelledError:
+                self.stop_event.set()
+                abort_event.set()
+                for task in media_tasks:
+                    task.cancel()
+                raise
+
+    def run_async(self):
+        """Crawl with the asyncio engine."""
+        start_postprocess_pool()
+        try:
+            asyncio.run(self.async_crawl())
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            abort_event.set()
+        finally:
+            try:
+                stop_postprocess_pool()
+            except KeyboardInterrupt:
+                abort_event.set()
+                stop_postprocess_pool()
 
-    # Clear activity when thread exits
-    if progress_tracker:
-        progress_tracker.clear_activity(thread_name)
 
 # --- Main execution block ---
+# Command line options that set a [Filter] option
+FILTER_FLAGS = {"--since": "date_from", "--until": "date_to", "--types": "types"}
+
+
+def load_post_filter() -> Optional[PostFilter]:
+    """The post filter configured in [Filter], or None if it keeps every post. Raises ValueError."""
+    def names(option: str) -> list[str]:
+        return config.get('Filter', option, fallback='').split(",")
+
+    post_filter = PostFilter(
+        date_from=parse_date(config.get('Filter', 'date_from', fallback='')),
+        date_to=parse_date(config.get('Filter', 'date_to', fallback='')),
+        date_field=config.get('Filter', 'date_field', fallback='post').strip().lower() or 'post',
+        types=names('types'),
+        tags=names('tags'),
+        exclude_tags=names('exclude_tags'),
+        access=names('access_control'),
+    )
+    return post_filter if post_filter.active else None
+
+
 if __name__ == "__main__":
     config.read('config.ini')
     max_workers = max(int(config.get('General', 'max_workers')), 1)
 
+    # Options (--flag) may appear anywhere; the remaining arguments are positional
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    sys.argv = [arg for arg in sys.argv if arg not in flags]
+    profile_path = None
+    resume = False
+    for flag in flags:
+        name, _, value = flag.partition("=")
+        if flag == "--replay":
+            replay_mode = True
+        elif flag == "--resume":
+            resume = True
+        elif name == "--profile":
+            profile_path = value or "jffscraper.prof"
+        elif name in FILTER_FLAGS and value:
+            # Command line filters override [Filter] in the config file
+            if not config.has_section('Filter'):
+                config.add_section('Filter')
+            config.set('Filter', FILTER_FLAGS[name], value)
+        else:
+            print(
+                f"Unknown option {flag}. "
+                "Usage: python app.py [--replay] [--resume] [--profile[=FILE]] "
+                "[--since=YYYY-MM-DD] [--until=YYYY-MM-DD] [--types=TYPE,...] [UserHash] [PosterID ...]"
+            )
+            sys.exit(1)
+
+    try:
+        post_filter = load_post_filter()
+    except ValueError as e:
+        print(f"[Filter] {e}")
+        sys.exit(1)
+    if post_filter:
+        print(f"Only keeping posts with {post_filter.describe()}.")
+
     # Initialize progress tracker
     use_progress_bar = config.getboolean('General', 'use_progress_bar', fallback=True)
     progress_tracker = ProgressTracker()
     progress_tracker.set_enabled(use_progress_bar)
 
+    user_hash = ""
     if len(sys.argv) >= 2:
         user_hash = sys.argv[1]
         print("(%s) Using user hash from command line parameters." % user_hash)
 
-    if len(sys.argv) >= 3:
-        poster_id = sys.argv[2]
-        print("(%s) Using poster ID from command line parameters." % poster_id)
-        progress_tracker.enable_uploader_id_display()
+    # Any number of poster IDs, as separate arguments and/or comma-separated
+    poster_ids = [pid.strip() for arg in sys.argv[2:] for pid in arg.split(",") if pid.strip()]
+    if poster_ids:
+        print("(%s) Using poster ID from command line parameters." % ", ".join(poster_ids))
 
     if user_hash == "":
         user_hash = config.get('Authentication', 'user_hash')
 
-    if user_hash == "":
+    if user_hash == "" and not replay_mode:
         print(
             "Specify UserHash4 in the config file or in the command line parameters and restart program. Aborted."
         )
         sys.exit(0)
-    else:
+    elif user_hash:
         if len(sys.argv) < 2: # Only print if it came from config
             print("(%s) Using user hash from config file." % user_hash)
 
-    if poster_id == "":
-        poster_id = config.get('Poster', 'poster_id', fallback="")
-        if poster_id and len(sys.argv) < 3: # Only print if it came from config
-            print("(%s) Using poster ID from config file." % poster_id)
+    if not poster_ids:
+        poster_ids = [pid.strip() for pid in config.get('Poster', 'poster_id', fallback="").split(",") if pid.strip()]
+        if poster_ids: # Only print if it came from config
+            print("(%s) Using poster ID from config file." % ", ".join(poster_ids))
+
+    # The uploader column only tells posts apart when a single poster is scraped
+    if len(poster_ids) == 1:
+        progress_tracker.enable_uploader_id_display()
+
+    # Finished pages per feed, for --resume (a replay never downloads, so it has nothing to record)
+    crawl_journal = None
+    if config.getboolean('Database', 'crawl_journal', fallback=True) and not replay_mode:
+        save_path = config.get('Paths', 'save_path')
+        os.makedirs(save_path, exist_ok=True)
+        crawl_journal = CrawlJournal(os.path.join(save_path, '.crawl_journal.db'))
+    elif resume:
+        print("--resume needs [Database] crawl_journal = True (and no --replay); crawling from the start.")
+
+    # URL and content hash index across uploaders, for deduplication
+    if config.getboolean('Dedupe', 'enabled', fallback=True) and not replay_mode:
+        save_path = config.get('Paths', 'save_path')
+        os.makedirs(save_path, exist_ok=True)
+        try:
+            media_index = MediaIndex(
+                os.path.join(save_path, '.media_index.db'),
+                link_mode=config.get('Dedupe', 'link_mode', fallback='hardlink').strip().lower(),
+            )
+        except ValueError as e:
+            print(f"[Dedupe] {e}")
+            sys.exit(1)
+
+    scraper = Scraper(user_hash, poster_ids, tracker=progress_tracker, journal=crawl_journal, resume=resume)
+
+    if config.getboolean('Cache', 'enabled', fallback=False) or replay_mode:
+        page_cache = PageCache(
+            config.get('Cache', 'path', fallback='') or os.path.join(config.get('Paths', 'save_path'), '.page_cache'),
+            ttl=config.getfloat('Cache', 'ttl_minutes', fallback=60) * 60,
+            codec=config.get('Cache', 'codec', fallback='auto'),
+        )
 
-    # Set the global start offset
-    current_offset = 0
+    engine = config.get('General', 'engine', fallback='threaded').strip().lower()
+    if replay_mode:
+        # Parsing only: pages come from the cache, posts go to the database, nothing is downloaded
+        engine = "threaded"
+        feeds = ", ".join(f"'{feed.name}'" for feed in scraper.feeds)
+        print(f"Replaying cached pages of {feeds} from {page_cache.folder}...")
+    elif engine == "async":
+        print("Starting download with the asyncio engine...")
+    else:
+        print(f"Starting download with {max_workers} page threads...")
+    if len(scraper.feeds) > 1:
+        print(f"Scraping {len(scraper.feeds)} posters concurrently: {', '.join(feed.name for feed in scraper.feeds)}")
 
-    print(f"Starting download with {max_workers} threads...")
+    start_adaptive_limits()
+    start_bandwidth_limit()
+    metrics_exporters = start_metrics(progress_tracker)
+    Database.on_batch = progress_tracker.add_db_batch
+
+    profiler = None
+    if profile_path:
+        progress_tracker.stages = StageTimer()
+        profiler = ThreadProfiler()
+        profiler.start()
 
     # Start progress display
     progress_tracker.start()
 
-    # --- Dynamic Thread Pool Executor ---
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit one worker for each slot in the pool
-            futures = [executor.submit(process_page_worker) for _ in range(max_workers)]
-
-            # This will wait for all threads to complete
-            # Threads will complete when stop_event is set and they finish their last job
-            concurrent.futures.wait(futures)
-
-    except KeyboardInterrupt:
-        stop_event.set()
-        # The 'with' block will handle shutting down the executor
+        scraper.run(engine)
     finally:
+        # Commit everything the database writers still have queued
+        Database.close_all()
+        if crawl_journal:
+            crawl_journal.close()
+        if media_index:
+            media_index.close()
+        if profiler:
+            profiler.stop(profile_path)
+        # The last metrics snapshot includes the final database commits
+        for exporter in metrics_exporters:
+            exporter.stop()
         progress_tracker.stop()
+
+        connection_stats = get_http_pool().summary_lines()
+        if connection_stats:
+            progress_tracker.console.print()
+            progress_tracker.console.print("[bold]Connections[/bold]")
+            for line in connection_stats:
+                progress_tracker.console.print(f"  {line}")
+
+        lost_pages = scraper.lost_pages
+        if lost_pages:
+            progress_tracker.console.print()
+            progress_tracker.console.print("[bold red]Pages that could not be fetched (offsets):[/bold red]")
+            for name, offsets in lost_pages.items():
+                progress_tracker.console.print(f"  {name}: {', '.join(str(offset) for offset in offsets)}")
+
+        if adaptive_limits:
+            progress_tracker.console.print()
+            progress_tracker.console.print("[bold]Concurrency[/bold]")
+            for limit in adaptive_limits.values():
+                progress_tracker.console.print(f"  {limit.summary()}")
+
+        if profiler:
+            progress_tracker.console.print()
+            progress_tracker.console.print("[bold]Profile[/bold] (stage time summed over threads)")
+            for line in progress_tracker.stages.table():
+                progress_tracker.console.print(f"  {line}", highlight=False)
+            progress_tracker.console.print(
+                f"  cProfile stats written to {profile_path} (python -m pstats {profile_path})", highlight=False
+            )
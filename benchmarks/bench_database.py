@@ -0,0 +1,142 @@
+"""
+Database write throughput benchmark.
+
+Compares the write-behind Database (WAL, batched executemany on a writer thread)
+with the previous per-row path (DELETE journal, one locked commit per row plus
+follow-up SELECTs for ids). Each post writes 1 post row, PHOTOS media rows and
+PHOTOS media updates, spread over THREADS crawler threads.
+
+Usage: python benchmarks/bench_database.py [posts] [threads]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+PHOTOS = 4
+
+
+def make_post(n: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        pid=str(100000 + n), mcid=f"{100000 + n}-MC-1722500000000", uploader_id="bench",
+        post_url=f"https://justfor.fans/?Post={n}", upload_date="2024-08-01",
+        upload_date_iso="2024-08-01T08:13:20", post_date="2024-08-01",
+        post_date_iso="2024-08-01T08:13:20", full_text="Lorem ipsum " * 20,
+        type="photo", pinned=False, access_control="Subscribers", store_url=None,
+        tags=["tag", "bench"],
+    )
+
+
+class LegacyWriter:
+    """The per-row write path from before the write-behind writer."""
+
+    def __init__(self, db_path: str):
+        # Reuse the schema, then switch the file back to the rollback journal the old path used
+        schema = Database(db_path)
+        schema.close()
+        schema._get_connection().execute("PRAGMA journal_mode=DELETE")
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._db_path = db_path
+
+    def _conn(self) -> sqlite3.Connection:
+        if getattr(self._local, "conn", None) is None:
+            conn = sqlite3.connect(self._db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return self._local.conn
+
+    def write_post(self, post):
+        conn = self._conn()
+        with self._lock:
+            conn.execute(
+                "INSERT INTO posts (pid, mcid, uploader_id, post_url, upload_date, upload_date_iso, post_date, "
+                "post_date_iso, full_text, type, pinned, access_control, store_url, tags) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(pid) DO UPDATE SET full_text = excluded.full_text",
+                (post.pid, post.mcid, post.uploader_id, post.post_url, post.upload_date, post.upload_date_iso,
+                 post.post_date, post.post_date_iso, post.full_text, post.type, 0, post.access_control,
+                 post.store_url, "[]"),
+            )
+            conn.commit()
+            post_id = conn.execute("SELECT id FROM posts WHERE pid = ?", (post.pid,)).fetchone()[0]
+        for i in range(PHOTOS):
+            url = f"https://cdn/{post.pid}/{i}.jpg"
+            existing = conn.execute("SELECT id FROM media WHERE post_id = ? AND url = ?", (post_id, url)).fetchone()
+            with self._lock:
+                if existing:
+                    media_id = existing[0]
+                else:
+                    cursor = conn.execute(
+                        "INSERT INTO media (post_id, media_type, url) VALUES (?, ?, ?)", (post_id, "photo", url)
+                    )
+                    media_id = cursor.lastrowid
+                conn.commit()
+            with self._lock:
+                conn.execute("UPDATE media SET file_path = ?, file_size = ? WHERE id = ?", (url, 1234, media_id))
+                conn.commit()
+
+    def finish(self):
+        pass
+
+
+class WriteBehindWriter:
+    def __init__(self, db_path: str):
+        self._db = Database(db_path)
+
+    def write_post(self, post):
+        self._db.insert_post(post)
+        for i in range(PHOTOS):
+            url = f"https://cdn/{post.pid}/{i}.jpg"
+            self._db.insert_media(post.pid, "photo", url)
+            self._db.update_media(post.pid, url, file_path=url, file_size=1234)
+
+    def finish(self):
+        self._db.close()
+
+
+def run(writer_cls, posts: int, threads: int) -> tuple[float, float]:
+    """Returns (seconds until crawler threads are done, seconds until everything is committed)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = writer_cls(os.path.join(tmp, "metadata.db"))
+        per_thread = posts // threads
+
+        def work(t: int):
+            for n in range(t * per_thread, (t + 1) * per_thread):
+                writer.write_post(make_post(n))
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=work, args=(t,)) for t in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        produced = time.perf_counter() - start
+        writer.finish()
+        committed = time.perf_counter() - start
+        return produced, committed
+
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rows = posts * (1 + 2 * PHOTOS)
+    print(f"{posts} posts x {PHOTOS} photos ({rows} row writes), {threads} threads")
+    for name, writer_cls in (("per-row (previous)", LegacyWriter), ("write-behind", WriteBehindWriter)):
+        produced, committed = run(writer_cls, posts, threads)
+        print(
+            f"  {name:<20} {rows / committed:>10,.0f} rows/s committed"
+            f"   crawler threads blocked {produced:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
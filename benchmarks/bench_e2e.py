@@ -0,0 +1,123 @@
+"""
+End-to-end crawl benchmark against a local stand-in server (no network access).
+
+Starts benchmarks/standin_server.py in-process, writes a config.ini pointing app.py at it
+and runs the full scraper (crawl, downloads, database) as a subprocess: once on an empty
+folder (first crawl) and once more on the result (re-run, everything skipped). Reports
+pages/s, posts/s, media MB/s served and the peak RSS of the scraper process.
+
+The stand-in streams are synthetic, so video post-processing (ffmpeg) fails and those
+videos are counted as failed; their streams are still downloaded and counted in MB/s.
+
+Usage: python benchmarks/bench_e2e.py [--posts N] [--photo-kb N] [--video-mb N] [--engine threaded|async] ...
+"""
+
+import argparse
+import configparser
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin_server import StandInServer  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_config(folder: str, server: StandInServer, args) -> str:
+    """config.ini for the run: the repository defaults, pointed at the stand-in server."""
+    config = configparser.ConfigParser(allow_no_value=True)
+    config.read(os.path.join(REPO, "config.ini"))
+    overrides = {
+        'General': {
+            'engine': args.engine, 'use_progress_bar': 'False', 'max_workers': str(args.workers),
+        },
+        'Paths': {'save_path': os.path.join(folder, "rips")},
+        'Authentication': {'user_hash': 'benchmark'},
+        'Poster': {'poster_id': ''},
+        'API': {'api_url': server.api_url, 'api_url_poster': server.api_url_poster},
+        'Cache': {'enabled': 'False'},
+        'Metrics': {'enabled': 'False'},
+    }
+    for section, values in overrides.items():
+        if not config.has_section(section):
+            config.add_section(section)
+        for key, value in values.items():
+            config.set(section, key, value)
+    path = os.path.join(folder, "config.ini")
+    with open(path, "w", encoding="utf-8") as f:
+        config.write(f)
+    return path
+
+
+def run_scraper(folder: str, log_path: str) -> tuple[float, int, int]:
+    """Run app.py in folder. Returns (wall seconds, peak RSS in bytes, exit code)."""
+    with open(log_path, "a", encoding="utf-8") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(REPO, "app.py")], cwd=folder, stdout=log, stderr=log)
+        # wait4 gives the resource usage of this child alone
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return elapsed, peak_rss, process.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200, help="posts in the feed (default 200)")
+    parser.add_argument("--photos-per-post", type=int, default=2)
+    parser.add_argument("--photo-kb", type=int, default=200, help="size of each photo (default 200 KB)")
+    parser.add_argument("--video-mb", type=float, default=2, help="size of each video stream (default 2 MB)")
+    parser.add_argument("--fragment-kb", type=int, default=256, help="video fragment size (default 256 KB)")
+    parser.add_argument("--video-format", choices=("dash", "hls"), default="dash")
+    parser.add_argument("--mix", default="photo,photo,text,video", help="repeating cycle of post types")
+    parser.add_argument("--engine", choices=("threaded", "async"), default="threaded")
+    parser.add_argument("--workers", type=int, default=4, help="page workers ([General] max_workers)")
+    parser.add_argument("--keep", action="store_true", help="keep the run folder (config, log, downloads)")
+    args = parser.parse_args()
+
+    server = StandInServer(
+        posts=args.posts,
+        photos_per_post=args.photos_per_post,
+        photo_size=args.photo_kb << 10,
+        video_size=int(args.video_mb * (1 << 20)),
+        fragment_size=args.fragment_kb << 10,
+        video_format=args.video_format,
+        mix=tuple(kind.strip() for kind in args.mix.split(",") if kind.strip()),
+    ).start()
+    folder = tempfile.mkdtemp(prefix="jff-bench-")
+    log_path = os.path.join(folder, "scraper.log")
+    write_config(folder, server, args)
+
+    media_mb = sum(server.media_bytes(n) for n in range(args.posts)) / 1024 ** 2
+    print(
+        f"{args.posts} posts ({args.mix}), {media_mb:.1f} MB of media, "
+        f"{args.engine} engine, {args.video_format} video, served from {server.base_url}"
+    )
+    try:
+        for name in ("first crawl", "re-run"):
+            server.reset_counts()
+            elapsed, peak_rss, code = run_scraper(folder, log_path)
+            counts = dict(server.counts)
+            status = "" if code == 0 else f"   (exit code {code}, see {log_path})"
+            print(
+                f"  {name:<12} {elapsed:>7.2f} s   {counts['pages'] / elapsed:>7.1f} pages/s"
+                f"   {args.posts / elapsed:>8.1f} posts/s   {counts['media_bytes'] / 1024 ** 2 / elapsed:>7.1f} MB/s"
+                f"   peak RSS {peak_rss / 1024 ** 2:>6.1f} MB{status}"
+            )
+    finally:
+        server.stop()
+        if args.keep:
+            print(f"  run folder: {folder}")
+        else:
+            import shutil
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Post parser benchmark and golden corpus check.
+
+benchmarks/corpus/posts.html is one getPosts.php response with a card for every variant
+Post.__init__ handles (video, photo, text, shoutout, pinned, store and burning posts, and
+each post date fallback). benchmarks/corpus/posts.expected.json holds the fields every
+card must parse to. Each installed parser backend is first checked against it (any
+difference is printed and the script exits with status 1), then timed: posts parsed per
+second for Post() alone and for whole pages (card extraction + Post), plus the memory
+allocated per post as traced by tracemalloc.
+
+Run with --update to rewrite the expected fields after an intended behavior change.
+Dates are parsed in UTC so the expected values don't depend on the local timezone.
+
+Usage: python benchmarks/bench_parser.py [--update] [--seconds N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ["TZ"] = "UTC"
+if hasattr(time, "tzset"):
+    time.tzset()
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from parsers import available_backends, get_parser  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+PAGE_PATH = os.path.join(CORPUS, "posts.html")
+EXPECTED_PATH = os.path.join(CORPUS, "posts.expected.json")
+
+FIELDS = (
+    "pid", "mcid", "uploader_id", "type", "pinned", "access_control", "store_url", "tags",
+    "post_url", "upload_date", "upload_date_iso", "post_date", "post_date_iso", "post_date_str",
+    "full_text", "excerpt", "basename",
+)
+
+
+def post_fields(post: 'app.Post') -> dict:
+    return {field: getattr(post, field, None) for field in FIELDS}
+
+
+def parse_page(parser, html_text: str) -> list['app.Post']:
+    """Posts of a page, skipping "Whom To Follow" like parse_posts (without the database)."""
+    return [app.Post(card) for card in parser.parse_cards(html_text) if "donotremove" not in card.classes]
+
+
+def check(backend: str, html_text: str, expected: list[dict]) -> bool:
+    """Compare a backend's parse of the corpus with the expected fields. Prints every difference."""
+    actual = [post_fields(post) for post in parse_page(get_parser(backend), html_text)]
+    ok = True
+    if len(actual) != len(expected):
+        print(f"  {backend}: {len(actual)} posts parsed, expected {len(expected)}")
+        ok = False
+    for got, want in zip(actual, expected):
+        for field in FIELDS:
+            if got[field] != want.get(field):
+                print(f"  {backend}: post {want.get('pid')} {field}: {got[field]!r} != expected {want.get(field)!r}")
+                ok = False
+    return ok
+
+
+def rate(fn, items: int, seconds: float) -> float:
+    """Items per second of fn() (which handles `items` items per call), run for about `seconds`."""
+    fn()  # Warm up
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return calls * items / elapsed
+
+
+def allocated_per_post(cards: list) -> tuple[float, float]:
+    """(KB allocated per Post at peak, KB still held per Post afterwards), traced by tracemalloc."""
+    tracemalloc.start()
+    try:
+        peaks = []
+        held = []
+        for card in cards:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            post = app.Post(card)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            held.append(current - before)
+            del post
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024, sum(held) / len(held) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="rewrite the expected fields from the current parser")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on each measurement (default 1)")
+    args = parser.parse_args()
+
+    app.config.read(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.ini"))
+    with open(PAGE_PATH, "r", encoding="utf-8") as f:
+        html_text = f.read()
+
+    backends = available_backends()
+    if args.update:
+        fields = [post_fields(post) for post in parse_page(get_parser(backends[0]), html_text)]
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as f:
+            json.dump(fields, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Wrote the fields of {len(fields)} posts ({backends[0]}) to {EXPECTED_PATH}")
+
+    with open(EXPECTED_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    print(f"Golden corpus: {len(expected)} posts")
+    failed = [backend for backend in backends if not check(backend, html_text, expected)]
+    if failed:
+        print(f"FAILED: {', '.join(failed)} parse the corpus differently than expected")
+        sys.exit(1)
+    print(f"  {', '.join(backends)}: all fields match")
+
+    print("Parser throughput")
+    for backend in backends:
+        backend_parser = get_parser(backend)
+        cards = [card for card in backend_parser.parse_cards(html_text) if "donotremove" not in card.classes]
+        post_rate = rate(lambda: [app.Post(card) for card in cards], len(cards), args.seconds)
+        page_rate = rate(lambda: parse_page(backend_parser, html_text), len(cards), args.seconds)
+        peak_kb, held_kb = allocated_per_post(cards)
+        print(
+            f"  {backend:<12} Post() {post_rate:>9,.0f} posts/s   page + Post() {page_rate:>9,.0f} posts/s"
+            f"   {peak_kb:>6.1f} KB allocated/post ({held_kb:.1f} KB held)"
+        )
+
+
+if __name__ == "__main__":
+    main()
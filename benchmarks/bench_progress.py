@@ -0,0 +1,94 @@
+"""
+Progress tracker update benchmark.
+
+Compares the previous ProgressTracker update path, where every call took the tracker lock
+and rebuilt the whole Rich display, with the current one, where updates only touch
+counters and Live's refresh thread renders at its refresh rate. Worker threads call
+set_activity the way the yt-dlp progress hook does (one call per fragment callback) with
+an increment every 50 calls, while a Live display refreshes into a buffer.
+
+Usage: python benchmarks/bench_progress.py [calls per thread] [threads]
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rich.console import Console  # noqa: E402
+from rich.live import Live  # noqa: E402
+
+from app import ProgressTracker  # noqa: E402
+
+
+class RenderOnUpdateTracker(ProgressTracker):
+    """The previous update path: render the full display under a lock on every call."""
+
+    def __init__(self):
+        super().__init__()
+        self._update_lock = threading.Lock()
+
+    def start(self):
+        self.live = Live(self._render(), console=self.console, refresh_per_second=self.REFRESH_PER_SECOND)
+        self.live.start()
+
+    def _update_display(self):
+        if self.live:
+            self.live.update(self._render())
+
+    def set_activity(self, thread_name: str, activity: str, progress: float = -1):
+        with self._update_lock:
+            self.activities[thread_name] = (activity, progress)
+            self._update_display()
+
+    def increment(self, media_type: str, status: str, name: str = None):
+        with self._update_lock:
+            super().increment(media_type, status, name)
+            self._update_display()
+
+
+def hook_calls(tracker: ProgressTracker, calls: int):
+    thread_name = threading.current_thread().name
+    for n in range(calls):
+        # Same work as download_hook for a video with a known size
+        speed_str = f"{(n % 40 + 1) * 1.5:.1f}MB/s"
+        tracker.set_activity(thread_name, f"Video: 2024-08-01 - 100123 - bench video [{speed_str}]", progress=n / calls)
+        if n % 50 == 0:
+            tracker.increment('photo', 'downloaded')
+
+
+def run(tracker_cls, calls: int, threads: int) -> float:
+    """Returns the average wall time per hook call in microseconds."""
+    tracker = tracker_cls()
+    tracker.console = Console(file=io.StringIO(), force_terminal=True, width=120)
+    tracker.start()
+    workers = [
+        threading.Thread(target=hook_calls, args=(tracker, calls), name=f"video_{i}")
+        for i in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    tracker.live.stop()
+    return elapsed / (calls * threads) * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"{threads} threads x {calls} progress hook calls")
+    before = run(RenderOnUpdateTracker, calls, threads)
+    after = run(ProgressTracker, calls, threads)
+    print(f"  render on every update (previous)  {before:>8.2f} us/call")
+    print(f"  render at refresh rate (current)   {after:>8.2f} us/call")
+    print(f"  speedup: {before / after:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+posts.raw_html storage benchmark.
+
+Compares storing each card's HTML as plain text, rewritten on every run (previous), with
+zlib-compressed raw_html_z plus a content hash that skips unchanged posts (current).
+Each variant writes POSTS posts twice - a first crawl and an unchanged re-run - and
+reports throughput of both passes and the final database size.
+
+Usage: python benchmarks/bench_raw_html.py [posts]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+_PLAIN_UPSERT_POST = """
+    INSERT INTO posts (
+        pid, mcid, uploader_id, post_url, upload_date, upload_date_iso,
+        post_date, post_date_iso, full_text, type, pinned,
+        access_control, store_url, tags, raw_html
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(pid) DO UPDATE SET
+        mcid = excluded.mcid, uploader_id = excluded.uploader_id, post_url = excluded.post_url,
+        upload_date = excluded.upload_date, upload_date_iso = excluded.upload_date_iso,
+        post_date = excluded.post_date, post_date_iso = excluded.post_date_iso,
+        full_text = excluded.full_text, type = excluded.type, pinned = excluded.pinned,
+        access_control = excluded.access_control, store_url = excluded.store_url,
+        tags = excluded.tags, raw_html = excluded.raw_html
+"""
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+
+def make_card(n: int, rng: random.Random) -> str:
+    """A card shaped like a getPosts.php card: mostly fixed markup plus a unique description."""
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120)))
+    images = "".join(
+        f'<div class="imageGallery galleryLarge"><img class="expandable" '
+        f'data-lazy="https://media.example/{n}/{i}.jpg" src="/img/placeholder.png" alt=""></div>'
+        for i in range(rng.randint(1, 8))
+    )
+    return (
+        f'<div class="mbsc-card jffPostClass shortenedPost AccessControl-Subscribers" data-pid="{n}">'
+        '<div class="mbsc-card-header"><div class="mbsc-avatar-container"><img class="mbsc-avatar" '
+        'src="https://media.example/avatar.jpg"></div>'
+        '<h5 class="mbsc-card-title mbsc-bold"><span onclick="location.href=\'/bench\'">Bench</span></h5>'
+        f'<div class="mbsc-card-subtitle">August {n % 28 + 1}, 2024, 8:13 am</div></div>'
+        f'<div class="mbsc-card-content"><div class="fr-view">{text}</div>{images}</div>'
+        '<div class="postTags"><a href="#">#tag</a> <a href="#">#bench</a></div>'
+        '<div class="mbsc-card-footer">' + '<button class="mbsc-btn mbsc-btn-flat">Like</button>' * 6 + '</div>'
+        '</div>'
+    )
+
+
+def make_post(n: int, raw_html: str) -> tuple[SimpleNamespace, str]:
+    post = SimpleNamespace(
+        pid=str(100000 + n), mcid=f"{100000 + n}-MC-1722500000000", uploader_id="bench",
+        post_url=f"https://justfor.fans/?Post={n}", upload_date="2024-08-01",
+        upload_date_iso="2024-08-01T08:13:20", post_date="2024-08-01",
+        post_date_iso="2024-08-01T08:13:20", full_text="", type="photo", pinned=False,
+        access_control="Subscribers", store_url=None, tags=["tag", "bench"],
+    )
+    return post, raw_html
+
+
+class PlainDatabase(Database):
+    """The previous raw_html path: plain text, rewritten on every insert."""
+
+    def _migrate_raw_html(self, conn):
+        pass
+
+    def insert_post(self, post, raw_html=None):
+        self._enqueue(_PLAIN_UPSERT_POST, (
+            post.pid, post.mcid, post.uploader_id, post.post_url, post.upload_date,
+            post.upload_date_iso, post.post_date, post.post_date_iso, post.full_text,
+            post.type, 0, post.access_control, post.store_url, json.dumps(post.tags), raw_html,
+        ))
+
+
+def run(db_cls, posts: list) -> tuple[float, float, int]:
+    """Returns (first pass posts/s, re-run posts/s, database size in bytes)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "metadata.db")
+        rates = []
+        for _ in range(2):
+            db = db_cls(db_path)
+            start = time.perf_counter()
+            for post, raw_html in posts:
+                db.insert_post(post, raw_html=raw_html)
+            db.close()
+            rates.append(len(posts) / (time.perf_counter() - start))
+        return rates[0], rates[1], os.path.getsize(db_path)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(1)
+    posts = [make_post(n, make_card(n, rng)) for n in range(count)]
+    html_mb = sum(len(raw_html) for _, raw_html in posts) / 1024 ** 2
+    print(f"{count} posts, {html_mb:.1f} MB of card HTML, written twice (first crawl + unchanged re-run)")
+
+    results = {}
+    for name, db_cls in (("plain text (previous)", PlainDatabase), ("compressed + hash", Database)):
+        first, rerun, size = results[name] = run(db_cls, posts)
+        print(
+            f"  {name:<22} first {first:>9,.0f} posts/s   re-run {rerun:>9,.0f} posts/s"
+            f"   db {size / 1024 ** 2:>6.1f} MB"
+        )
+    before, after = results["plain text (previous)"][2], results["compressed + hash"][2]
+    print(f"  database size reduction: {1 - after / before:.0%}")
+
+
+if __name__ == "__main__":
+    main()
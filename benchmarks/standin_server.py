@@ -0,0 +1,292 @@
+"""
+Local stand-in for the justfor.fans endpoints the scraper talks to, for offline benchmarks.
+
+Serves getPosts.php pagination (ending with the "as sad as you are" page), photo files
+with Range support, a license endpoint returning 16 byte keys, and small DASH or HLS
+video streams split into fragments. Content is generated deterministically from the
+post number, so repeated runs see the same feed. Media bytes are synthetic: the scraper
+downloads them like real media, but ffmpeg post-processing of the video streams fails.
+
+Usage: python benchmarks/standin_server.py [port] [posts]   (serves until Ctrl-C)
+"""
+
+import base64
+import hashlib
+import http.server
+import json
+import re
+import sys
+import threading
+import urllib.parse
+
+PAGE_SIZE = 10  # Posts per getPosts.php page, as on the site
+END_OF_FEED = '<div class="text-center">We looked everywhere, but there are no posts - as sad as you are.</div>'
+
+
+class StandInServer:
+    """
+    Threaded HTTP server emulating the site. posts is the total feed length; every
+    `mix` cycle of post types repeats (photo/video/text). Sizes are in bytes.
+
+        with StandInServer(posts=500) as server:
+            print(server.api_url)
+    """
+
+    def __init__(
+        self,
+        posts: int = 200,
+        photos_per_post: int = 2,
+        photo_size: int = 200 << 10,
+        video_size: int = 2 << 20,
+        fragment_size: int = 256 << 10,
+        video_format: str = "dash",
+        mix: tuple = ("photo", "photo", "text", "video"),
+        port: int = 0,
+    ):
+        if video_format not in ("dash", "hls"):
+            raise ValueError(f"Unknown video format: {video_format}")
+        self.posts = posts
+        self.photos_per_post = photos_per_post
+        self.photo_size = photo_size
+        self.video_size = video_size
+        self.fragment_size = max(fragment_size, 1)
+        self.video_format = video_format
+        self.mix = tuple(mix)
+        self._lock = threading.Lock()
+        self.counts = {'pages': 0, 'licenses': 0, 'media_bytes': 0, 'requests': 0}
+        self._blocks: dict[int, bytes] = {}
+
+        handler = type("StandInHandler", (_Handler,), {"stand_in": self})
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._thread = None
+
+    # --- Lifecycle ---
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/ajax/getPosts.php?UserHash4={{hash}}&StartAt={{seq}}&Type=All"
+
+    @property
+    def api_url_poster(self) -> str:
+        return f"{self.base_url}/ajax/getPosts.php?UserHash4={{hash}}&StartAt={{seq}}&Type=One&PosterID={{poster_id}}&Page=Profile"
+
+    def count(self, key: str, value: int = 1):
+        with self._lock:
+            self.counts[key] += value
+
+    def reset_counts(self):
+        with self._lock:
+            for key in self.counts:
+                self.counts[key] = 0
+
+    # --- Content ---
+
+    def post_type(self, n: int) -> str:
+        return self.mix[n % len(self.mix)]
+
+    def media_bytes(self, n: int) -> int:
+        """Bytes one post's media adds to a full download."""
+        kind = self.post_type(n)
+        if kind == "photo":
+            return self.photos_per_post * self.photo_size
+        if kind == "video":
+            return self.video_size + self.video_size // 8  # video + audio stream
+        return 0
+
+    def block(self, size: int) -> bytes:
+        """Deterministic filler of the given size (cached per size)."""
+        with self._lock:
+            data = self._blocks.get(size)
+            if data is None:
+                seed = hashlib.sha256(str(size).encode()).digest()
+                data = self._blocks[size] = (seed * (size // len(seed) + 1))[:size]
+            return data
+
+    def card(self, n: int) -> str:
+        pid = str(100000 + n)
+        kind = self.post_type(n)
+        mcid = base64.b64encode(f"{pid}-MC-{1722500000000 + n * 60000}".encode()).decode()
+        minute = n % 60
+        media = ""
+        if kind == "photo":
+            media = '<div class="imageGallery galleryLarge">' + "".join(
+                f'<img class="expandable" src="{self.base_url}/media/photo/{pid}-{i}.jpg">'
+                for i in range(self.photos_per_post)
+            ) + "</div>"
+        elif kind == "video":
+            ext = "mpd" if self.video_format == "dash" else "m3u8"
+            sources = json.dumps({"1080p": f"{self.base_url}/media/video/{pid}/manifest.{ext}"})
+            license_url = f"{self.base_url}/license?kid={hashlib.md5(pid.encode()).hexdigest()}"
+            media = (
+                f'<div class="videoBlock"><a onclick=\'playVideo("{pid}", {sources}, "poster", 0, '
+                f'"widevine", "token", "{license_url}")\'>Play</a></div>'
+            )
+        text = " ".join(["Stand-in post", pid] + ["lorem ipsum dolor sit amet"] * (n % 7 + 1))
+        return (
+            f'<div class="mbsc-card jffPostClass {kind} AccessControl-Subscribers" '
+            f'data-pid="{base64.b64encode(pid.encode()).decode()}">'
+            '<div class="mbsc-card-header"><h5 class="mbsc-card-title mbsc-bold">'
+            '<span onclick="location.href=\'/standin\'">Stand-in</span></h5>'
+            f'<div class="mbsc-card-subtitle" onclick="location.href=\'/?Post={mcid}&amp;x=1\'" '
+            f'data-server-time="2024-08-01 08:{minute:02d}:00">August 1, 2024, 8:{minute:02d} am</div></div>'
+            f'<div class="mbsc-card-content"><div class="fr-view">{text}</div>{media}</div>'
+            f'<div class="postTags"><a href="#">#standin</a> <a href="#">#tag{n % 5}</a></div>'
+            '</div>'
+        )
+
+    def page(self, offset: int) -> str:
+        if offset >= self.posts:
+            return f"<html><body>{END_OF_FEED}</body></html>"
+        cards = "".join(self.card(n) for n in range(offset, min(offset + PAGE_SIZE, self.posts)))
+        return f"<html><body>{cards}</body></html>"
+
+    def fragments(self, size: int) -> list[int]:
+        return [min(self.fragment_size, size - start) for start in range(0, size, self.fragment_size)]
+
+    def manifest(self, pid: str, name: str) -> tuple[str, str]:
+        """(content type, body) of a DASH MPD or HLS playlist for a video post."""
+        base = f"{self.base_url}/media/video/{pid}"
+        streams = {"video": self.video_size, "audio": self.video_size // 8}
+        if self.video_format == "dash":
+            sets = []
+            for kind, size in streams.items():
+                mime, extra = (
+                    ('video/mp4', 'codecs="avc1.64001f" width="1280" height="720" bandwidth="2000000"')
+                    if kind == "video" else
+                    ('audio/mp4', 'codecs="mp4a.40.2" audioSamplingRate="44100" bandwidth="128000"')
+                )
+                segments = "".join(
+                    f'<SegmentURL media="{base}/{kind}/{i}.m4s"/>' for i in range(len(self.fragments(size)))
+                )
+                sets.append(
+                    f'<AdaptationSet mimeType="{mime}" contentType="{kind}">'
+                    f'<Representation id="{kind}" {extra}><SegmentList duration="4" timescale="1">'
+                    f'<Initialization sourceURL="{base}/{kind}/init.mp4"/>{segments}</SegmentList>'
+                    '</Representation></AdaptationSet>'
+                )
+            duration = 4 * len(self.fragments(streams["video"]))
+            return "application/dash+xml", (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+                f'mediaPresentationDuration="PT{duration}S" minBufferTime="PT2S" '
+                'profiles="urn:mpeg:dash:profile:isoff-on-demand:2011">'
+                f'<Period>{"".join(sets)}</Period></MPD>'
+            )
+        if name == "manifest.m3u8":
+            return "application/vnd.apple.mpegurl", (
+                "#EXTM3U\n"
+                f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="aud",NAME="audio",DEFAULT=YES,URI="{base}/audio.m3u8"\n'
+                '#EXT-X-STREAM-INF:BANDWIDTH=2000000,RESOLUTION=1280x720,CODECS="avc1.64001f,mp4a.40.2",AUDIO="aud"\n'
+                f"{base}/video.m3u8\n"
+            )
+        kind = name.split(".")[0]
+        lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-TARGETDURATION:4", "#EXT-X-PLAYLIST-TYPE:VOD",
+                 f'#EXT-X-MAP:URI="{base}/{kind}/init.mp4"']
+        for i in range(len(self.fragments(streams[kind]))):
+            lines += ["#EXTINF:4.0,", f"{base}/{kind}/{i}.m4s"]
+        lines.append("#EXT-X-ENDLIST")
+        return "application/vnd.apple.mpegurl", "\n".join(lines) + "\n"
+
+    def fragment(self, kind: str, name: str) -> bytes:
+        if name == "init.mp4":
+            return self.block(1024)
+        size = self.video_size if kind == "video" else self.video_size // 8
+        return self.block(self.fragments(size)[int(name.split(".")[0])])
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stand_in: StandInServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/octet-stream", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+            if content_type in ("image/jpeg", "video/mp4"):
+                self.stand_in.count('media_bytes', len(body))
+
+    def _send_media(self, data: bytes, content_type: str):
+        """Serve media, honouring a single "bytes=start-[end]" Range."""
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+            if start >= len(data):
+                self._send(416, b"", headers={"Content-Range": f"bytes */{len(data)}"})
+                return
+            body = data[start:end + 1]
+            self._send(206, body, content_type, {"Content-Range": f"bytes {start}-{end}/{len(data)}", "Accept-Ranges": "bytes"})
+            return
+        self._send(200, data, content_type, {"Accept-Ranges": "bytes"})
+
+    def do_GET(self):
+        stand_in = self.stand_in
+        stand_in.count('requests')
+        url = urllib.parse.urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+
+        if url.path == "/ajax/getPosts.php":
+            query = urllib.parse.parse_qs(url.query)
+            offset = int(query.get("StartAt", ["0"])[0])
+            stand_in.count('pages')
+            self._send(200, stand_in.page(offset).encode("utf-8"), "text/html; charset=utf-8")
+        elif parts[:2] == ["media", "photo"] and len(parts) == 3:
+            self._send_media(stand_in.block(stand_in.photo_size), "image/jpeg")
+        elif parts[:2] == ["media", "video"] and len(parts) == 4 and parts[3].startswith(("manifest", "video.", "audio.")):
+            content_type, body = stand_in.manifest(parts[2], parts[3])
+            self._send(200, body.encode("utf-8"), content_type)
+        elif parts[:2] == ["media", "video"] and len(parts) == 5 and parts[3] in ("video", "audio"):
+            try:
+                data = stand_in.fragment(parts[3], parts[4])
+            except (ValueError, IndexError):
+                self._send(404, b"")
+                return
+            self._send_media(data, "video/mp4")
+        elif url.path == "/license":
+            stand_in.count('licenses')
+            kid = urllib.parse.parse_qs(url.query).get("kid", [""])[0]
+            self._send(200, hashlib.md5(kid.encode()).digest())
+        else:
+            self._send(404, b"")
+
+    do_HEAD = do_GET
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    posts = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with StandInServer(posts=posts, port=port) as server:
+        print(f"Serving {posts} posts on {server.base_url}")
+        print(f"  api_url = {server.api_url}")
+        print(f"  api_url_poster = {server.api_url_poster}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,149 @@
+"""
+Adaptive concurrency control for JFFScraper.
+Grows or shrinks the number of concurrent requests per request class at runtime (AIMD)
+from the latency and error rate it observes.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class AdaptiveLimit:
+    """
+    AIMD limit for one request class. Samples are collected in windows of `window` requests;
+    after each window the limit is
+        - halved (multiplicative decrease) when the error rate is above error_threshold or
+          the average latency is above latency_factor x the best window average seen, else
+        - raised by 1 (additive increase),
+    always staying within [minimum, maximum]. Every change is passed to `log`.
+
+    Workers either hold a slot() around each request, so at most `limit` run at once,
+    or read `limit` directly for settings applied per job (e.g. fragments per video).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 16,
+        window: int = 20,
+        error_threshold: float = 0.1,
+        latency_factor: float = 2.0,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.name = name
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.window = max(window, 1)
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+        self._log = log
+        self._cond = threading.Condition()
+        self._active = 0
+        self._samples: list[tuple[float, bool, int]] = []
+        self._window_start = time.monotonic()
+        self._best_latency: Optional[float] = None
+        self.changes = 0
+        self.low = self.high = self.limit
+
+    # --- Slots ---
+
+    def acquire(self, abort: Optional[threading.Event] = None) -> bool:
+        """Wait for a free slot. Returns False if abort is set while waiting."""
+        with self._cond:
+            while self._active >= self.limit:
+                if abort is not None and abort.is_set():
+                    return False
+                self._cond.wait(0.5)
+            self._active += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    # --- Samples ---
+
+    def record(self, latency: float, ok: bool = True, nbytes: int = 0):
+        """Record one finished request and adjust the limit when a window is complete."""
+        with self._cond:
+            self._samples.append((latency, ok, nbytes))
+            if len(self._samples) < self.window:
+                return
+            samples, self._samples = self._samples, []
+            elapsed = time.monotonic() - self._window_start
+            self._window_start = time.monotonic()
+            message = self._adjust(samples, elapsed)
+            # A raised limit may free waiting workers
+            self._cond.notify_all()
+        if message and self._log:
+            self._log(message)
+
+    def _adjust(self, samples: list[tuple[float, bool, int]], elapsed: float) -> Optional[str]:
+        errors = sum(1 for _, ok, _ in samples if not ok)
+        error_rate = errors / len(samples)
+        latencies = [latency for latency, ok, _ in samples if ok]
+        avg_latency = sum(latencies) / len(latencies) if latencies else None
+        mbps = sum(nbytes for _, _, nbytes in samples) / elapsed / 1024 ** 2 if elapsed > 0 else 0.0
+
+        reason = None
+        if error_rate > self.error_threshold:
+            reason = f"errors {error_rate:.0%}"
+        elif (avg_latency is not None and self._best_latency
+              and avg_latency > self._best_latency * self.latency_factor):
+            reason = f"latency {avg_latency:.2f}s vs best {self._best_latency:.2f}s"
+
+        if avg_latency is not None:
+            if self._best_latency is None or avg_latency < self._best_latency:
+                self._best_latency = avg_latency
+            else:
+                # Let the baseline follow slow drift so one lucky window doesn't pin it
+                self._best_latency = self._best_latency * 0.95 + avg_latency * 0.05
+
+        old = self.limit
+        if reason:
+            self.limit = max(self.minimum, old // 2)
+        else:
+            self.limit = min(self.maximum, old + 1)
+        if self.limit == old:
+            return None
+
+        self.changes += 1
+        self.low = min(self.low, self.limit)
+        self.high = max(self.high, self.limit)
+        latency_str = f"{avg_latency:.2f}s" if avg_latency is not None else "n/a"
+        return (
+            f"[concurrency] {self.name}: {old} -> {self.limit} "
+            f"({reason or 'healthy'}; latency {latency_str}, {mbps:.1f} MB/s, {len(samples)} samples)"
+        )
+
+    def summary(self) -> str:
+        return (
+            f"{self.name.capitalize()}: settled at {self.limit} "
+            f"(range {self.low}-{self.high}, {self.changes} changes, bounds {self.minimum}-{self.maximum})"
+        )
+
+
+class Slot:
+    """Context manager holding one slot of an AdaptiveLimit (no-op when limit is None)."""
+
+    def __init__(self, limit: Optional[AdaptiveLimit], abort: Optional[threading.Event] = None):
+        self._limit = limit
+        self._abort = abort
+        self.acquired = False
+
+    def __enter__(self) -> 'Slot':
+        if self._limit is None:
+            self.acquired = True
+        else:
+            self.acquired = self._limit.acquire(self._abort)
+        return self
+
+    def __exit__(self, *exc):
+        if self._limit is not None and self.acquired:
+            self._limit.release()
+        return False
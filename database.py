@@ -3,19 +3,95 @@ Thread-safe SQLite database module for JFFScraper.
 Stores post metadata and media information.
 """
 
+import atexit
+import hashlib
 import json
+import queue
+import re
 import sqlite3
 import threading
 import time
-from typing import Optional
+import zlib
+from typing import Callable, Optional
+
+
+_UPSERT_POST = """
+    INSERT INTO posts (
+        pid, mcid, uploader_id, post_url, upload_date, upload_date_iso,
+        post_date, post_date_iso, full_text, type, pinned,
+        access_control, store_url, tags, raw_html_z, content_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(pid) DO UPDATE SET
+        mcid = excluded.mcid,
+        uploader_id = excluded.uploader_id,
+        post_url = excluded.post_url,
+        upload_date = excluded.upload_date,
+        upload_date_iso = excluded.upload_date_iso,
+        post_date = excluded.post_date,
+        post_date_iso = excluded.post_date_iso,
+        full_text = excluded.full_text,
+        type = excluded.type,
+        pinned = excluded.pinned,
+        access_control = excluded.access_control,
+        store_url = excluded.store_url,
+        tags = excluded.tags,
+        raw_html = NULL,
+        raw_html_z = excluded.raw_html_z,
+        content_hash = excluded.content_hash
+"""
+
+# A stored decryption key is a hex encoded 16 byte AES key; older versions also stored error pages
+_KEY_RE = re.compile(r"[0-9a-fA-F]{32}")
+
+
+def _valid_key(key: Optional[str]) -> bool:
+    """True for a hex encoded 16 byte key."""
+    return isinstance(key, str) and _KEY_RE.fullmatch(key) is not None
+
+
+# Media rows reference their post by pid, resolved inside the writer's transaction
+_UPSERT_MEDIA = """
+    INSERT INTO media (
+        post_id, media_type, url, quality, license_url, kid, decryption_key
+    ) SELECT id, ?, ?, ?, ?, ?, ? FROM posts WHERE pid = ?
+    ON CONFLICT(post_id, url) DO UPDATE SET
+        media_type = excluded.media_type,
+        quality = excluded.quality,
+        license_url = excluded.license_url,
+        kid = excluded.kid,
+        decryption_key = COALESCE(excluded.decryption_key, media.decryption_key)
+"""
+
+# A post has at most 1 video: drop the old row if the video URL changed
+_DELETE_STALE_VIDEO = """
+    DELETE FROM media
+    WHERE media_type = 'video' AND url != ?
+        AND post_id = (SELECT id FROM posts WHERE pid = ?)
+"""
+
+# A None sha256 (file found on disk, not downloaded) keeps the stored hash
+_UPDATE_MEDIA_FILE = """
+    UPDATE media SET file_path = ?, file_size = ?, sha256 = COALESCE(?, sha256)
+    WHERE url = ? AND post_id = (SELECT id FROM posts WHERE pid = ?)
+"""
 
 
 class Database:
-    """Thread-safe SQLite database. Write operations are serialized via a lock."""
+    """
+    Thread-safe SQLite database. Writes are queued and applied in batched transactions
+    by a single writer thread per database, so callers never wait on commits.
+    """
+
+    BATCH_SIZE = 500
+    QUEUE_SIZE = 10000
+    RAW_HTML_COMPRESSION = 6  # zlib level for posts.raw_html_z
 
     _instances: dict[str, 'Database'] = {}
     _instances_lock = threading.Lock()
 
+    # Called by writer threads after each committed batch with (rows, seconds); e.g. for metrics
+    on_batch: Optional[Callable[[int, float], None]] = None
+
     @classmethod
     def get_instance(cls, db_path: str) -> 'Database':
         """Get or create a Database instance for the given path."""
@@ -24,11 +100,36 @@ class Database:
                 cls._instances[db_path] = cls(db_path)
             return cls._instances[db_path]
 
+    @classmethod
+    def close_all(cls):
+        """Flush and close every open database. Registered to run at interpreter exit."""
+        with cls._instances_lock:
+            instances = list(cls._instances.values())
+            cls._instances.clear()
+        for db in instances:
+            db.close()
+
+    @classmethod
+    def pending_writes(cls) -> int:
+        """Writes queued but not yet committed, over every open database."""
+        with cls._instances_lock:
+            return sum(db._queue.qsize() for db in cls._instances.values())
+
     def __init__(self, db_path: str):
         self._db_path = db_path
-        self._write_lock = threading.Lock()
         self._local = threading.local()
+        self._queue: queue.Queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._closed = False
+        self._closed_lock = threading.Lock()  # Nothing is queued after the stop sentinel
+        # kid -> decryption key, so keys still waiting in the write queue are found too
+        self._keys: dict[str, str] = {}
+        self._keys_lock = threading.Lock()
+        # pid -> content hash of the stored post row, loaded on first insert_post
+        self._hashes: Optional[dict[str, str]] = None
+        self._hashes_lock = threading.Lock()
         self._init_schema()
+        self._writer = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+        self._writer.start()
 
     def _get_connection(self) -> sqlite3.Connection:
         """Get thread-local database connection with retry for transient I/O errors."""
@@ -37,7 +138,7 @@ class Database:
                 try:
                     conn = sqlite3.connect(self._db_path, timeout=10, check_same_thread=False)
                     conn.row_factory = sqlite3.Row
-                    conn.execute("PRAGMA journal_mode=DELETE")
+                    conn.execute("PRAGMA journal_mode=WAL")
                     conn.execute("PRAGMA synchronous=NORMAL")
                     conn.execute("PRAGMA busy_timeout=5000")
                     self._local.connection = conn
@@ -70,6 +171,8 @@ class Database:
                 store_url TEXT,
                 tags TEXT,
                 raw_html TEXT,
+                raw_html_z BLOB,
+                content_hash TEXT,
                 created_at TEXT DEFAULT (datetime('now'))
             )
         """)
@@ -86,6 +189,7 @@ class Database:
                 decryption_key TEXT,
                 file_path TEXT,
                 file_size INTEGER,
+                sha256 TEXT,
                 created_at TEXT DEFAULT (datetime('now')),
                 FOREIGN KEY (post_id) REFERENCES posts(id)
             )
@@ -94,8 +198,144 @@ class Database:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_pid ON posts(pid)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_uploader ON posts(uploader_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_media_post_id ON media(post_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_media_kid ON media(kid)")
+
+        # Content hash of downloaded files, added after the first release of the schema
+        if "sha256" not in {row[1] for row in conn.execute("PRAGMA table_info(media)")}:
+            conn.execute("ALTER TABLE media ADD COLUMN sha256 TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_media_sha256 ON media(sha256)")
+
+        # Media upserts key on (post_id, url). Older databases may hold duplicates; keep the newest row.
+        has_unique = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_media_post_url'"
+        ).fetchone()
+        if not has_unique:
+            conn.execute("""
+                DELETE FROM media WHERE id NOT IN (
+                    SELECT MAX(id) FROM media GROUP BY post_id, url
+                )
+            """)
+            conn.execute("CREATE UNIQUE INDEX idx_media_post_url ON media(post_id, url)")
 
         conn.commit()
+        self._migrate_raw_html(conn)
+
+    def _migrate_raw_html(self, conn: sqlite3.Connection):
+        """Move plain-text raw_html from older databases into the compressed raw_html_z column."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(posts)")}
+        for column, column_type in (("raw_html_z", "BLOB"), ("content_hash", "TEXT")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE posts ADD COLUMN {column} {column_type}")
+        conn.commit()
+
+        migrated = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, raw_html FROM posts WHERE raw_html IS NOT NULL LIMIT ?", (self.BATCH_SIZE,)
+            ).fetchall()
+            if not rows:
+                break
+            with conn:
+                conn.executemany(
+                    "UPDATE posts SET raw_html_z = ?, raw_html = NULL WHERE id = ?",
+                    [(self._compress_html(raw_html), post_id) for post_id, raw_html in rows]
+                )
+            migrated += len(rows)
+
+        if migrated:
+            # Give the freed pages back to the file system
+            conn.execute("VACUUM")
+            print(f"Database {self._db_path}: compressed raw HTML of {migrated} posts")
+
+    @classmethod
+    def _compress_html(cls, raw_html: Optional[str]) -> Optional[bytes]:
+        return zlib.compress(raw_html.encode("utf-8"), cls.RAW_HTML_COMPRESSION) if raw_html else None
+
+    # --- Write-behind queue ---
+
+    def _enqueue(self, sql: str, params: tuple):
+        with self._closed_lock:
+            if self._closed:
+                raise RuntimeError(f"Database {self._db_path} is closed")
+            self._queue.put((sql, params))
+
+    def _writer_loop(self):
+        """Writer thread target. Drains the queue and applies writes in batches."""
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            writes = [op for op in batch if isinstance(op, tuple)]
+            if writes:
+                # Whatever goes wrong, the thread must live on to release flush() and close() waiters
+                try:
+                    start = time.monotonic()
+                    self._apply(writes)
+                    if Database.on_batch:
+                        Database.on_batch(len(writes), time.monotonic() - start)
+                except Exception as e:
+                    print(f"Warning: Database writer error ({self._db_path}): {e!r}")
+
+            stop = False
+            for op in batch:
+                if isinstance(op, threading.Event):
+                    op.set()  # flush() marker: everything queued before it is committed
+                elif op is None:
+                    stop = True
+                self._queue.task_done()
+            if stop:
+                break
+
+        conn = self._get_connection()
+        conn.close()
+        self._local.connection = None
+
+    def _apply(self, writes: list[tuple[str, tuple]]):
+        """Apply writes in one transaction, grouping runs of the same statement into executemany."""
+        conn = self._get_connection()
+        try:
+            with conn:
+                start = 0
+                while start < len(writes):
+                    sql = writes[start][0]
+                    end = start
+                    while end < len(writes) and writes[end][0] == sql:
+                        end += 1
+                    conn.executemany(sql, [params for _, params in writes[start:end]])
+                    start = end
+        except sqlite3.Error:
+            # Fall back to one transaction per write so a single bad row does not lose the batch
+            for sql, params in writes:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                except sqlite3.Error as e:
+                    print(f"Warning: Database write failed ({self._db_path}): {e}")
+
+    def flush(self):
+        """Block until every write queued so far has been committed."""
+        done = threading.Event()
+        with self._closed_lock:
+            if self._closed:
+                return
+            self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Commit all pending writes and stop the writer thread."""
+        with self._closed_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join()
+
+    # --- Reads ---
 
     def get_post_id(self, pid: str) -> Optional[int]:
         """Get the database ID of a post by its pid."""
@@ -105,52 +345,6 @@ class Database:
         row = cursor.fetchone()
         return row[0] if row else None
 
-    def insert_post(self, post, raw_html: Optional[str] = None) -> int:
-        """Insert or update a post. Returns the database ID."""
-        tags_json = json.dumps(post.tags) if post.tags else None
-
-        with self._write_lock:
-            self._get_connection().execute("""
-                INSERT INTO posts (
-                    pid, mcid, uploader_id, post_url, upload_date, upload_date_iso,
-                    post_date, post_date_iso, full_text, type, pinned,
-                    access_control, store_url, tags, raw_html
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(pid) DO UPDATE SET
-                    mcid = excluded.mcid,
-                    uploader_id = excluded.uploader_id,
-                    post_url = excluded.post_url,
-                    upload_date = excluded.upload_date,
-                    upload_date_iso = excluded.upload_date_iso,
-                    post_date = excluded.post_date,
-                    post_date_iso = excluded.post_date_iso,
-                    full_text = excluded.full_text,
-                    type = excluded.type,
-                    pinned = excluded.pinned,
-                    access_control = excluded.access_control,
-                    store_url = excluded.store_url,
-                    tags = excluded.tags,
-                    raw_html = excluded.raw_html
-            """, (
-                post.pid,
-                getattr(post, 'mcid', None),
-                post.uploader_id,
-                getattr(post, 'post_url', None),
-                post.upload_date,
-                post.upload_date_iso,
-                post.post_date,
-                post.post_date_iso,
-                post.full_text,
-                post.type,
-                1 if post.pinned else 0,
-                post.access_control,
-                post.store_url,
-                tags_json,
-                raw_html
-            ))
-            self._get_connection().commit()
-            return self.get_post_id(post.pid)
-
     def get_media_id(self, post_id: int, media_type: str, url: str) -> Optional[int]:
         """
         Get database ID of a media record.
@@ -170,44 +364,106 @@ class Database:
         row = cursor.fetchone()
         return row[0] if row else None
 
+    def get_raw_html(self, pid: str) -> Optional[str]:
+        """Get the stored card HTML of a post, or None."""
+        row = self._get_connection().execute(
+            "SELECT raw_html_z, raw_html FROM posts WHERE pid = ?", (pid,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] is not None:
+            return zlib.decompress(row[0]).decode("utf-8")
+        return row[1]
+
+    def get_decryption_key(self, kid: str) -> Optional[str]:
+        """
+        Get a previously stored decryption key by its kid, or None. A stored value that isn't a
+        valid key (e.g. an error page saved by an older version) is a miss, so the license is
+        fetched again and the fresh key replaces it.
+        """
+        with self._keys_lock:
+            key = self._keys.get(kid)
+        if _valid_key(key):
+            return key
+        cursor = self._get_connection().execute(
+            "SELECT DISTINCT decryption_key FROM media WHERE kid = ? AND decryption_key IS NOT NULL",
+            (kid,)
+        )
+        key = next((row[0] for row in cursor if _valid_key(row[0])), None)
+        if key is None:
+            return None
+        with self._keys_lock:
+            self._keys[kid] = key
+        return key
+
+    # --- Writes (queued) ---
+
+    def _stored_hashes(self) -> dict[str, str]:
+        """pid -> content hash for every stored post (call with _hashes_lock held)."""
+        if self._hashes is None:
+            self._hashes = dict(self._get_connection().execute(
+                "SELECT pid, content_hash FROM posts WHERE content_hash IS NOT NULL"
+            ).fetchall())
+        return self._hashes
+
+    def insert_post(self, post, raw_html: Optional[str] = None):
+        """
+        Queue an insert or update of a post. Skipped when the post (its fields and raw HTML)
+        is unchanged since it was last stored; raw HTML is stored zlib-compressed.
+        """
+        tags_json = json.dumps(post.tags) if post.tags else None
+
+        values = (
+            post.pid,
+            getattr(post, 'mcid', None),
+            post.uploader_id,
+            getattr(post, 'post_url', None),
+            post.upload_date,
+            post.upload_date_iso,
+            post.post_date,
+            post.post_date_iso,
+            post.full_text,
+            post.type,
+            1 if post.pinned else 0,
+            post.access_control,
+            post.store_url,
+            tags_json,
+        )
+        content_hash = hashlib.blake2b(
+            json.dumps([values, raw_html]).encode("utf-8"), digest_size=16
+        ).hexdigest()
+        with self._hashes_lock:
+            hashes = self._stored_hashes()
+            if hashes.get(post.pid) == content_hash:
+                return
+            hashes[post.pid] = content_hash
+
+        self._enqueue(_UPSERT_POST, values + (self._compress_html(raw_html), content_hash))
+
     def insert_media(
         self,
-        post_db_id: int,
+        pid: str,
         media_type: str,
         url: str,
         quality: Optional[str] = None,
         license_url: Optional[str] = None,
         kid: Optional[str] = None,
         decryption_key: Optional[str] = None
-    ) -> int:
-        """Insert or update a media record. Returns the database ID."""
-        existing_id = self.get_media_id(post_db_id, media_type, url)
-
-        with self._write_lock:
-            conn = self._get_connection()
-            if existing_id:
-                conn.execute("""
-                    UPDATE media SET
-                        url = ?, quality = ?, license_url = ?, kid = ?, decryption_key = ?
-                    WHERE id = ?
-                """, (url, quality, license_url, kid, decryption_key, existing_id))
-                conn.commit()
-                return existing_id
-            else:
-                cursor = conn.execute("""
-                    INSERT INTO media (
-                        post_id, media_type, url, quality, license_url, kid, decryption_key
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (post_db_id, media_type, url, quality, license_url, kid, decryption_key))
-                conn.commit()
-                return cursor.lastrowid
-
-    def update_media(self, media_id: int, file_path: str = None, file_size: int = None):
-        """Update media record with file path and size after download."""
-        with self._write_lock:
-            conn = self._get_connection()
-            conn.execute(
-                "UPDATE media SET file_path = ?, file_size = ? WHERE id = ?",
-                (file_path, file_size, media_id)
-            )
-            conn.commit()
+    ):
+        """
+        Queue an insert or update of a media record, keyed by (post pid, url).
+        A None decryption_key keeps the key already stored for the record.
+        """
+        if kid and _valid_key(decryption_key):
+            with self._keys_lock:
+                self._keys[kid] = decryption_key
+        if media_type == "video":
+            self._enqueue(_DELETE_STALE_VIDEO, (url, pid))
+        self._enqueue(_UPSERT_MEDIA, (media_type, url, quality, license_url, kid, decryption_key, pid))
+
+    def update_media(self, pid: str, url: str, file_path: str = None, file_size: int = None, sha256: str = None):
+        """Queue an update of a media record with file path, size and SHA-256 after download."""
+        self._enqueue(_UPDATE_MEDIA_FILE, (file_path, file_size, sha256, url, pid))
+
+
+atexit.register(Database.close_all)
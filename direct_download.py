@@ -0,0 +1,349 @@
+"""
+Direct download engine for JFFScraper (photos and other plain HTTP media).
+Resumes partial .tmp files with HTTP Range requests, splits large files into parallel
+byte-range segments and validates the final size before the atomic rename. The SHA-256
+of each file is computed while it is written where the bytes arrive in order.
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+from curl_cffi.requests.exceptions import RequestException
+
+from http_client import ClientPool
+from rate_limit import retry_after_seconds
+
+
+BUFFER_SIZE = 1 << 20          # File write buffer
+MIN_SEGMENT_SIZE = 1 << 20     # Never split into segments smaller than this
+STATE_SAVE_INTERVAL = 4 << 20  # Sync segment data and persist its progress every this many bytes
+HASH_READ_SIZE = 1 << 20       # Read size when hashing file content that was not streamed
+
+# Called with the size of every chunk written, from the downloading thread; may sleep to cap bandwidth
+throttle: Optional[Callable[[int], None]] = None
+
+
+class DownloadError(Exception):
+    """
+    Raised when a download cannot be completed or fails validation. retryable is False for
+    failures a retry won't fix (e.g. 403/404); retry_after comes from the server's Retry-After.
+    """
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def status_error(pool: ClientPool, response, message: str) -> DownloadError:
+    """DownloadError for an unexpected HTTP status, retryable as the pool's policy says."""
+    return DownloadError(
+        f"HTTP {response.status_code} for {message}",
+        retryable=pool.retry.retryable(response.status_code),
+        retry_after=retry_after_seconds(response.headers.get("Retry-After")),
+    )
+
+
+def file_sha256(path: str, digest=None, start: int = 0) -> str:
+    """SHA-256 hex digest of a file. digest, if given, already covers the first start bytes."""
+    if digest is None:
+        digest, start = hashlib.sha256(), 0
+    with open(path, "rb") as f:
+        f.seek(start)
+        while True:
+            chunk = f.read(HASH_READ_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_range(header: Optional[str]) -> tuple[Optional[int], Optional[int]]:
+    """(first byte, total size) from a Content-Range header ("bytes 0-99/1234" or "bytes */1234")."""
+    match = re.match(r"bytes\s+(?:(\d+)-\d+|\*)/(\d+)", header or "")
+    if not match:
+        return None, None
+    return (int(match.group(1)) if match.group(1) else None), int(match.group(2))
+
+
+class _SegmentState:
+    """
+    Progress of a segmented download, persisted next to the .tmp file as <file>.tmp.parts
+    so an interrupted download resumes every segment where it stopped.
+    """
+
+    def __init__(self, path: str, size: int, segments: list[list[int]]):
+        self.path = path
+        self.size = size
+        self.segments = segments  # [start, end (inclusive), bytes done]
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # Serializes writing the .parts file
+        self._unsaved = 0
+
+    @classmethod
+    def load(cls, path: str) -> Optional['_SegmentState']:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(path, int(data["size"]), [list(map(int, s)) for s in data["segments"]])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self):
+        # Segment threads save concurrently: one writer at a time, each with the latest snapshot
+        with self._save_lock:
+            with self._lock:
+                data = {"size": self.size, "segments": [list(s) for s in self.segments]}
+                self._unsaved = 0
+            tmp_path = self.path + ".new"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+    def advance(self, index: int, count: int):
+        with self._lock:
+            self.segments[index][2] += count
+            self._unsaved += count
+            due = self._unsaved >= STATE_SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def complete(self) -> bool:
+        return all(start + done > end for start, end, done in self.segments)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _sync(out_file):
+    """Push a file's buffered writes through to the disk."""
+    out_file.flush()
+    os.fsync(out_file.fileno())
+
+
+def _fetch_into(pool: ClientPool, url: str, tmp_path: str, offset: int, headers: dict,
+                accept: Callable[[int, int], bool], end: Optional[int] = None, on_synced=None, digest=None):
+    """
+    GET url and write the body into tmp_path starting at offset, never past byte end. The body
+    is written from curl's callback on the session's own handle, which keeps the connection
+    reusable. Before the first byte is written, accept(status, Content-Length or -1) decides
+    whether the response is the one asked for; a rejected body is read and dropped, so an
+    error page or an unexpected full body never lands in the file.
+    digest is updated with every chunk written. on_synced, if given, is called with the number
+    of bytes that reached the disk (flushed and fsynced), every STATE_SAVE_INTERVAL bytes and
+    once more when the request ends, so progress is never recorded ahead of the data.
+    Returns (response, bytes written).
+    """
+    mode = "r+b" if os.path.exists(tmp_path) else "wb"
+    written = 0
+    unsynced = 0
+    accepted = None
+    with open(tmp_path, mode, buffering=BUFFER_SIZE) as out_file:
+        out_file.seek(offset)
+
+        def write(chunk: bytes):
+            nonlocal written, unsynced, accepted
+            received = len(chunk)  # Reported back to curl as consumed, written or not
+            if accepted is None:
+                accepted = accept(*pool.receiving())
+            if not accepted:
+                return received
+            if end is not None:
+                chunk = chunk[:max(end + 1 - offset - written, 0)]
+                if not chunk:
+                    return received
+            out_file.write(chunk)
+            written += len(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            if on_synced:
+                unsynced += len(chunk)
+                if unsynced >= STATE_SAVE_INTERVAL:
+                    _sync(out_file)
+                    on_synced(unsynced)
+                    unsynced = 0
+            if throttle:
+                throttle(len(chunk))
+            return received
+
+        try:
+            # Retries happen a level up, where the partial body can be resumed
+            response = pool.get(url, retries=0, headers=headers, content_callback=write)
+        finally:
+            if on_synced and unsynced:
+                _sync(out_file)
+                on_synced(unsynced)
+    return response, written
+
+
+def _fetch_first(pool: ClientPool, url: str, tmp_path: str, offset: int, window: int,
+                 digest) -> tuple[Optional[int], int, int]:
+    """
+    Fetch bytes [offset, offset + window) into tmp_path, resuming whatever is already there.
+    A body written from the start of the file is hashed into digest on the way.
+    Returns (total size or None if unknown, bytes present in tmp_path afterwards, bytes hashed).
+    """
+    end = offset + window - 1
+    headers = {"Range": f"bytes={offset}-{end}"}
+
+    def accept(status: int, length: int) -> bool:
+        # A 200 is the whole file, which only fits a download that starts at byte 0
+        return (status == 206 and length <= window) or (status == 200 and not offset)
+
+    # A resumed download must not run past the window; a 200 from byte 0 may be any length
+    response, written = _fetch_into(pool, url, tmp_path, offset, headers, accept,
+                                    end=end if offset else None, digest=None if offset else digest)
+
+    if response.status_code == 206:
+        first, total = content_range(response.headers.get("Content-Range"))
+        if first != offset:
+            os.truncate(tmp_path, offset)
+            raise DownloadError(f"Unexpected Content-Range {response.headers.get('Content-Range')!r} for {url}")
+        return total, offset + written, 0 if offset else written
+
+    if response.status_code == 200:
+        # No range support: the body is the whole file
+        if offset:
+            os.remove(tmp_path)
+            return _fetch_first(pool, url, tmp_path, 0, window, digest)
+        length = response.headers.get("Content-Length")
+        return (int(length) if length and length.isdigit() else None), written, written
+
+    if response.status_code == 416:
+        # Requested range starts past the end: the .tmp may already hold the whole file
+        _, total = content_range(response.headers.get("Content-Range"))
+        if total is not None and total == offset:
+            return total, offset, 0
+        raise DownloadError(f"Partial file {tmp_path} does not match the remote size, restarting", retryable=False)
+
+    raise status_error(pool, response, url)
+
+
+def _fetch_segment(pool: ClientPool, url: str, tmp_path: str, state: _SegmentState, index: int):
+    """
+    Fetch the rest of one segment. Only a 206 no longer than the range asked for is written,
+    and never past the segment's end, so a bad response can't overwrite a neighbouring segment.
+    """
+    start, end, done = state.segments[index]
+    if start + done > end:
+        return
+    headers = {"Range": f"bytes={start + done}-{end}"}
+    response, written = _fetch_into(
+        pool, url, tmp_path, start + done, headers,
+        accept=lambda status, length: status == 206 and length <= end + 1 - start - done,
+        end=end,
+        on_synced=lambda n: state.advance(index, n),
+    )
+    if response.status_code != 206:
+        raise status_error(pool, response, f"segment {start}-{end} of {url}")
+    first, _ = content_range(response.headers.get("Content-Range"))
+    if first != start + done:
+        # Only this segment's own bytes were written; fetch them again
+        state.advance(index, -written)
+        raise DownloadError(f"Unexpected Content-Range {response.headers.get('Content-Range')!r} for segment {start}-{end} of {url}")
+
+
+def _split(offset: int, total: int, max_segments: int) -> list[list[int]]:
+    """Split [offset, total) into up to max_segments ranges of at least MIN_SEGMENT_SIZE."""
+    remaining = total - offset
+    count = max(1, min(max_segments, remaining // MIN_SEGMENT_SIZE))
+    size = -(-remaining // count)
+    return [
+        [start, min(start + size, total) - 1, 0]
+        for start in range(offset, total, size)
+    ]
+
+
+def download(
+    pool: ClientPool,
+    url: str,
+    path: str,
+    segment_threshold: int = 8 << 20,
+    max_segments: int = 4,
+) -> tuple[int, str]:
+    """
+    Download url to path through <path>.tmp. Returns (final file size, SHA-256 hex digest).
+
+    The digest is computed as the first request's body is written; only content that
+    arrived out of order (parallel segments, resumed files) is read back to finish it.
+    A leftover .tmp (or .tmp.parts segment state) from an earlier run is resumed rather than
+    re-fetched. The first request asks for segment_threshold bytes; if the file is larger,
+    the rest is fetched as up to max_segments parallel byte ranges. Failures are retried
+    with the pool's retry policy, each attempt resuming from what is already on disk.
+    """
+    attempt = 0
+    while True:
+        try:
+            return _download(pool, url, path, segment_threshold, max_segments)
+        except (DownloadError, RequestException) as e:
+            if attempt >= pool.retry.retries or not getattr(e, 'retryable', True):
+                raise
+            time.sleep(pool.retry.delay(attempt, getattr(e, 'retry_after', None)))
+            pool.stats[pool.host_class(url)].record_retry()
+            attempt += 1
+
+
+def _download(pool: ClientPool, url: str, path: str, segment_threshold: int, max_segments: int) -> tuple[int, str]:
+    tmp_path = path + ".tmp"
+    parts_path = tmp_path + ".parts"
+    digest = hashlib.sha256()
+    hashed = 0  # Leading bytes of the file already fed to digest
+
+    state = _SegmentState.load(parts_path) if os.path.exists(tmp_path) else None
+    if state is not None:
+        total = state.size
+    else:
+        offset = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
+        try:
+            total, offset, hashed = _fetch_first(pool, url, tmp_path, offset, segment_threshold, digest)
+        except DownloadError as e:
+            # Only a .tmp that doesn't match the remote file is thrown away
+            if offset == 0 or e.retryable:
+                raise
+            os.remove(tmp_path)
+            total, offset, hashed = _fetch_first(pool, url, tmp_path, 0, segment_threshold, digest)
+
+        if total is not None and offset < total:
+            # The segments start after the first window, so it must be on disk before they are recorded
+            with open(tmp_path, "r+b") as tmp_file:
+                os.fsync(tmp_file.fileno())
+            state = _SegmentState(parts_path, total, _split(offset, total, max_segments))
+            state.save()
+
+    if state is not None:
+        workers = sum(1 for start, end, done in state.segments if start + done <= end)
+        try:
+            if workers == 1:
+                for index in range(len(state.segments)):
+                    _fetch_segment(pool, url, tmp_path, state, index)
+            elif workers > 1:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="segment") as executor:
+                    futures = [
+                        executor.submit(_fetch_segment, pool, url, tmp_path, state, index)
+                        for index in range(len(state.segments))
+                    ]
+                    for future in futures:
+                        future.result()
+        finally:
+            state.save()
+        if not state.complete():
+            raise DownloadError(f"Incomplete segments for {url}")
+
+    size = os.path.getsize(tmp_path)
+    if total is not None and size != total:
+        raise DownloadError(f"Size mismatch for {url}: got {size} bytes, expected {total}")
+
+    sha256 = digest.hexdigest() if hashed == size else file_sha256(tmp_path, digest if hashed else None, hashed)
+    os.replace(tmp_path, path)
+    if state is not None:
+        state.remove()
+    return size, sha256
@@ -0,0 +1,120 @@
+"""
+In-memory file index for JFFScraper.
+Answers "is this item already downloaded?" without scanning the destination folder per item.
+"""
+
+import os
+import threading
+from typing import Optional
+
+
+class FileIndex:
+    """
+    Thread-safe index of the files in one folder, loaded once with a single os.scandir
+    and kept current through add()/discard() as files are written.
+
+    Supported lookups (mirroring the glob patterns they replace):
+        find(prefix, suffix)  ->  glob("{prefix}*{suffix}") for a 50-char basename prefix
+        find_pid(pid, ext)    ->  glob("* - {pid} -*{ext}")
+    """
+
+    PREFIX_LEN = 50
+
+    _instances: dict[str, 'FileIndex'] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, folder: str) -> 'FileIndex':
+        """Get or create the index for the given folder."""
+        key = os.path.abspath(folder)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(folder)
+            return cls._instances[key]
+
+    def __init__(self, folder: str):
+        self._folder = folder
+        self._lock = threading.Lock()
+        self._names: set[str] = set()
+        # (basename prefix, suffix) -> file names; suffix is the last one or two dotted parts (".txt", ".03.jpg")
+        self._by_prefix: dict[tuple[str, str], set[str]] = {}
+        # (token between " - " and " -", extension) -> file names
+        self._by_pid: dict[tuple[str, str], set[str]] = {}
+        self._load()
+
+    def _load(self):
+        """Populate the index from the folder contents."""
+        try:
+            with os.scandir(self._folder) as entries:
+                names = [entry.name for entry in entries if entry.is_file()]
+        except FileNotFoundError:
+            names = []
+        with self._lock:
+            for name in names:
+                self._add_name(name)
+
+    def _keys(self, name: str):
+        """Yield the (table, key) pairs under which a file name is indexed."""
+        parts = name.split(".")
+        for n in (1, 2):
+            if len(parts) > n:
+                suffix = "." + ".".join(parts[-n:])
+                stem = name[:-len(suffix)]
+                yield self._by_prefix, (stem[:self.PREFIX_LEN], suffix)
+
+        if name.startswith("."):
+            return  # glob's "*" never matches a leading dot
+        # Every token the glob "* - {token} -*{ext}" would match: each text run that starts
+        # after a " - " and ends before a " -" in the stem, e.g. the PID in "... - PID -.mp4"
+        stem, ext = os.path.splitext(name)
+        start = stem.find(" - ")
+        while start != -1:
+            end = stem.find(" -", start + 3)
+            while end != -1:
+                yield self._by_pid, (stem[start + 3:end], ext)
+                end = stem.find(" -", end + 1)
+            start = stem.find(" - ", start + 1)
+
+    def _add_name(self, name: str):
+        if name in self._names:
+            return
+        self._names.add(name)
+        for table, key in self._keys(name):
+            table.setdefault(key, set()).add(name)
+
+    def _discard_name(self, name: str):
+        if name not in self._names:
+            return
+        self._names.discard(name)
+        for table, key in self._keys(name):
+            names = table.get(key)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del table[key]
+
+    @staticmethod
+    def _first(names: Optional[set[str]]) -> Optional[str]:
+        return min(names) if names else None
+
+    def add(self, path: str):
+        """Record a file that has been written into this folder."""
+        with self._lock:
+            self._add_name(os.path.basename(path))
+
+    def discard(self, path: str):
+        """Forget a file that has been removed or renamed."""
+        with self._lock:
+            self._discard_name(os.path.basename(path))
+
+    def find(self, prefix: str, suffix: str) -> Optional[str]:
+        """Path of a file whose name starts with prefix (max 50 chars) and ends with suffix, or None."""
+        with self._lock:
+            name = self._first(self._by_prefix.get((prefix[:self.PREFIX_LEN], suffix)))
+        return os.path.join(self._folder, name) if name else None
+
+    def find_pid(self, pid: str, ext: str) -> Optional[str]:
+        """Path of a file named "* - {pid} -*{ext}", or None."""
+        with self._lock:
+            name = self._first(self._by_pid.get((pid, ext)))
+        return os.path.join(self._folder, name) if name else None
@@ -0,0 +1,253 @@
+"""
+HTTP client pool for JFFScraper.
+Hands out one curl_cffi session per thread, caps concurrent requests per host, paces and
+retries requests (see rate_limit) and collects connection statistics (reuse, TLS
+handshakes, time to first byte).
+"""
+
+import asyncio
+import threading
+import time
+import urllib.parse
+from typing import Iterable, Optional
+
+from curl_cffi import CurlHttpVersion, CurlInfo
+from curl_cffi import requests as curl_requests
+from curl_cffi.requests.exceptions import RequestException
+
+from rate_limit import RetryPolicy, TokenBucket, retry_after_seconds
+
+
+# Per-transfer values curl reports back on each response
+_INFOS = [CurlInfo.NUM_CONNECTS, CurlInfo.APPCONNECT_TIME, CurlInfo.STARTTRANSFER_TIME]
+
+
+class ConnectionStats:
+    """Thread-safe connection counters for one host class."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.tls_handshakes = 0
+        self.ttfb_total = 0.0
+        self.ttfb_max = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    def record(self, infos: dict):
+        """Record one finished request from its curl infos."""
+        new_connections = infos.get(CurlInfo.NUM_CONNECTS) or 0
+        tls_time = infos.get(CurlInfo.APPCONNECT_TIME) or 0.0
+        ttfb = infos.get(CurlInfo.STARTTRANSFER_TIME) or 0.0
+        with self._lock:
+            self.requests += 1
+            if new_connections:
+                self.new_connections += new_connections
+            else:
+                self.reused_connections += 1
+            if tls_time > 0:
+                self.tls_handshakes += 1
+            self.ttfb_total += ttfb
+            self.ttfb_max = max(self.ttfb_max, ttfb)
+
+    def record_retry(self, status: Optional[int] = None):
+        """Record a request that is about to be retried (status None: connection error)."""
+        with self._lock:
+            self.retries += 1
+            if status == 429:
+                self.throttled += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': self.reused_connections,
+                'tls_handshakes': self.tls_handshakes,
+                'ttfb_avg': self.ttfb_total / self.requests if self.requests else 0.0,
+                'ttfb_max': self.ttfb_max,
+                'retries': self.retries,
+                'throttled': self.throttled,
+            }
+
+
+class ClientPool:
+    """
+    Pool of curl_cffi sessions, one per thread, so connections are reused without sharing
+    a curl handle between threads. Requests are split into two host classes:
+        'site'  - the justfor.fans pages and license endpoint
+        'media' - everything else (image/video CDN)
+    Each host gets its own concurrency cap depending on its class, and each class its own
+    token bucket (rate limit). Throttled (429) and transiently failing requests are retried
+    with jittered exponential backoff; a 429 also pauses the whole class for its Retry-After.
+    """
+
+    def __init__(
+        self,
+        site_hosts: Iterable[str] = ("justfor.fans",),
+        site_max_connections: int = 8,
+        media_max_connections: int = 16,
+        http2: bool = True,
+        impersonate: str = "chrome",
+        site_rate: float = 0.0,
+        site_burst: int = 4,
+        media_rate: float = 0.0,
+        media_burst: int = 16,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        self._site_hosts = {h.lower() for h in site_hosts if h}
+        self._limits = {
+            'site': max(site_max_connections, 1),
+            'media': max(media_max_connections, 1),
+        }
+        self._http_version = CurlHttpVersion.V2TLS if http2 else CurlHttpVersion.V1_1
+        self._impersonate = impersonate
+        self._local = threading.local()
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        self.stats = {'site': ConnectionStats(), 'media': ConnectionStats()}
+        self.buckets = {
+            'site': TokenBucket(site_rate, site_burst),
+            'media': TokenBucket(media_rate, media_burst),
+        }
+        self.retry = retry or RetryPolicy()
+
+    def host_class(self, url: str) -> str:
+        """'site' or 'media' for a URL."""
+        host = (urllib.parse.urlparse(url).hostname or "").lower()
+        for site_host in self._site_hosts:
+            if host == site_host or host.endswith("." + site_host):
+                return 'site'
+        return 'media'
+
+    def _session_options(self) -> dict:
+        return {
+            'impersonate': self._impersonate,
+            'http_version': self._http_version,
+            'curl_infos': _INFOS,
+        }
+
+    def session(self) -> curl_requests.Session:
+        """The calling thread's session."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = curl_requests.Session(**self._session_options())
+            self._local.session = session
+        return session
+
+    def receiving(self) -> tuple[int, int]:
+        """
+        (status, Content-Length or -1) of the response the calling thread's session is receiving.
+        Valid inside a content_callback, where curl has parsed the final response's headers.
+        """
+        curl = self.session().curl
+        return int(curl.getinfo(CurlInfo.RESPONSE_CODE)), int(curl.getinfo(CurlInfo.CONTENT_LENGTH_DOWNLOAD_T))
+
+    def async_session(self, max_clients: int = 10) -> curl_requests.AsyncSession:
+        """A new AsyncSession with the pool's settings. Report its responses with record()."""
+        return curl_requests.AsyncSession(max_clients=max_clients, **self._session_options())
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = (urllib.parse.urlparse(url).hostname or "").lower()
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self._limits[self.host_class(url)])
+                self._host_slots[host] = slot
+            return slot
+
+    def record(self, url: str, response):
+        """Add a response's connection info to the stats of its host class."""
+        infos = getattr(response, 'infos', None)
+        if infos:
+            self.stats[self.host_class(url)].record(infos)
+
+    def retry_delay(self, url: str, response, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying a response, or None if its status isn't retryable.
+        A 429 also pauses the URL's host class so other workers back off with it.
+        """
+        if not self.retry.retryable(response.status_code):
+            return None
+        delay = self.retry.delay(attempt, retry_after_seconds(response.headers.get("Retry-After")))
+        if response.status_code == 429:
+            self.buckets[self.host_class(url)].pause(delay)
+        return delay
+
+    def get(self, url: str, retries: Optional[int] = None, **kwargs):
+        """
+        GET a URL on the calling thread's session, within the host's connection cap and rate limit.
+        Retryable failures are retried up to `retries` times (default: the pool's policy); the last
+        response is returned whatever its status. Callers that write the body through
+        content_callback pass retries=0 and retry themselves.
+        """
+        retries = self.retry.retries if retries is None else retries
+        host_class = self.host_class(url)
+        attempt = 0
+        while True:
+            self.buckets[host_class].wait()
+            status = None
+            try:
+                with self._slot(url):
+                    response = self.session().get(url, **kwargs)
+            except RequestException:
+                if attempt >= retries:
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                self.record(url, response)
+                delay = self.retry_delay(url, response, attempt)
+                if delay is None or attempt >= retries:
+                    return response
+                status = response.status_code
+            self.stats[host_class].record_retry(status)
+            attempt += 1
+            time.sleep(delay)
+
+    async def async_pace(self, url: str):
+        """Wait for the URL's rate limit from a coroutine."""
+        delay = self.buckets[self.host_class(url)].reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def async_get(self, session: curl_requests.AsyncSession, url: str, retries: Optional[int] = None, **kwargs):
+        """get() for the asyncio engine, on one of this pool's async sessions."""
+        retries = self.retry.retries if retries is None else retries
+        host_class = self.host_class(url)
+        attempt = 0
+        while True:
+            await self.async_pace(url)
+            status = None
+            try:
+                response = await session.get(url, **kwargs)
+            except RequestException:
+                if attempt >= retries:
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                self.record(url, response)
+                delay = self.retry_delay(url, response, attempt)
+                if delay is None or attempt >= retries:
+                    return response
+                status = response.status_code
+            self.stats[host_class].record_retry(status)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def summary_lines(self) -> list[str]:
+        """Human readable connection stats per host class."""
+        lines = []
+        for host_class, stats in self.stats.items():
+            s = stats.snapshot()
+            if not s['requests']:
+                continue
+            lines.append(
+                f"{host_class.capitalize()}: {s['requests']} requests, "
+                f"{s['new_connections']} new connections ({s['tls_handshakes']} TLS handshakes), "
+                f"{s['reused_connections']} reused, "
+                f"TTFB avg {s['ttfb_avg'] * 1000:.0f} ms / max {s['ttfb_max'] * 1000:.0f} ms"
+                + (f", {s['retries']} retried ({s['throttled']} throttled)" if s['retries'] else "")
+            )
+        return lines
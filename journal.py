@@ -0,0 +1,89 @@
+"""
+Crawl journal for JFFScraper.
+Records, per feed, which page offsets have been fully processed (the page and every media
+job its posts queued), so an interrupted crawl can be resumed without repeating them.
+"""
+
+import sqlite3
+import threading
+from typing import Optional
+
+
+class CrawlJournal:
+    """
+    Thread-safe journal stored in a small SQLite database (WAL, one commit per page).
+
+    Each feed has one current run. begin() starts a new run unless resuming an unfinished
+    one; mark_done() records finished offsets as they happen; finish() closes the run once
+    the feed was crawled to its end, so the next resume starts over.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_runs (
+                    feed TEXT PRIMARY KEY,
+                    started_at TEXT DEFAULT (datetime('now')),
+                    finished_at TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_pages (
+                    feed TEXT NOT NULL,
+                    page_offset INTEGER NOT NULL,
+                    posts INTEGER,
+                    done_at TEXT DEFAULT (datetime('now')),
+                    PRIMARY KEY (feed, page_offset)
+                )
+            """)
+
+    def begin(self, feed: str, resume: bool) -> Optional[set[int]]:
+        """
+        Start crawling a feed. With resume and an unfinished earlier run, that run continues
+        and its finished offsets are returned; otherwise a new run starts and None is returned.
+        """
+        with self._lock:
+            if resume:
+                row = self._conn.execute(
+                    "SELECT finished_at FROM crawl_runs WHERE feed = ?", (feed,)
+                ).fetchone()
+                if row is not None and row[0] is None:
+                    return {
+                        offset for (offset,) in self._conn.execute(
+                            "SELECT page_offset FROM crawl_pages WHERE feed = ?", (feed,)
+                        )
+                    }
+            with self._conn:
+                self._conn.execute("DELETE FROM crawl_pages WHERE feed = ?", (feed,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO crawl_runs (feed, started_at, finished_at) VALUES (?, datetime('now'), NULL)",
+                    (feed,),
+                )
+            return None
+
+    def mark_done(self, feed: str, offset: int, posts: int):
+        """Record a page whose posts and media have all been processed."""
+        with self._lock:
+            if self._closed:
+                return  # A straggling job after shutdown: the page is fetched again on resume
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO crawl_pages (feed, page_offset, posts) VALUES (?, ?, ?)",
+                    (feed, offset, posts),
+                )
+
+    def finish(self, feed: str):
+        """The feed was crawled to its end: the next resume starts a new run."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE crawl_runs SET finished_at = datetime('now') WHERE feed = ?", (feed,))
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
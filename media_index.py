@@ -0,0 +1,175 @@
+"""
+Content index for JFFScraper.
+Remembers the SHA-256 and size of every downloaded media file across posts and uploaders,
+so a media URL seen before is not downloaded again and identical content is stored once.
+"""
+
+import errno
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Optional
+
+LINK_MODES = ("hardlink", "reflink", "copy")
+FICLONE = 0x40049409  # Linux ioctl: share another file's extents (btrfs, XFS, bcachefs)
+
+
+def _reflink(src: str, dst: str):
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+
+
+def link_file(src: str, dst: str, mode: str) -> bool:
+    """
+    Replace dst with a hardlink or reflink to src (mode "hardlink" or "reflink").
+    Returns False, leaving dst as it was, for mode "copy" or when the file system can't link them.
+    """
+    if mode not in ("hardlink", "reflink"):
+        return False
+    try:
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            return True
+    except OSError:
+        return False
+    tmp_path = dst + ".link"
+    try:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        if mode == "hardlink":
+            os.link(src, tmp_path)
+        else:
+            _reflink(src, tmp_path)
+        os.replace(tmp_path, dst)
+        return True
+    except OSError:
+        # Different file systems, no link support, too many links, ...
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def place_copy(src: str, dst: str, mode: str):
+    """Put the content of src at dst: linked as mode says where possible, copied otherwise."""
+    if link_file(src, dst, mode):
+        return
+    tmp_path = dst + ".copy"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class MediaIndex:
+    """
+    Thread-safe URL and content index stored in a small SQLite database (WAL).
+
+    urls maps every downloaded media URL to the SHA-256 of its content; content maps each
+    SHA-256 to its size and the file that holds it. Entries whose file has been deleted or
+    changed size are ignored and replaced by the next download.
+    """
+
+    def __init__(self, path: str, link_mode: str = "hardlink"):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link_mode} (expected one of {', '.join(LINK_MODES)})")
+        self.path = path
+        self.link_mode = link_mode
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS content (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    path TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_content_path ON content(path)")
+
+    @staticmethod
+    def _present(path: str, size: int) -> bool:
+        try:
+            return os.path.getsize(path) == size
+        except OSError:
+            return False
+
+    def find_url(self, url: str) -> Optional[tuple[str, int, str]]:
+        """(sha256, size, path) of the stored content of url, or None if unknown or gone from disk."""
+        with self._lock:
+            if self._closed:
+                return None
+            row = self._conn.execute(
+                "SELECT content.sha256, content.size, content.path FROM urls"
+                " JOIN content ON content.sha256 = urls.sha256 WHERE urls.url = ?",
+                (url,),
+            ).fetchone()
+        if row is None or not self._present(row[2], row[1]):
+            return None
+        return row
+
+    def reuse(self, url: str, path: str) -> Optional[tuple[str, int]]:
+        """
+        Put the stored content of url at path instead of downloading it again.
+        Returns (sha256, size), or None when url has to be downloaded.
+        """
+        known = self.find_url(url)
+        if known is None:
+            return None
+        sha256, size, known_path = known
+        if os.path.abspath(known_path) == os.path.abspath(path):
+            return None  # Overwriting the stored copy itself
+        try:
+            place_copy(known_path, path, self.link_mode)
+        except OSError:
+            return None
+        return sha256, size
+
+    def store(self, url: str, path: str, sha256: str, size: int) -> bool:
+        """
+        Record a downloaded file. If identical content is already stored in another file,
+        path is replaced by a link to it and True is returned.
+        """
+        with self._lock:
+            if self._closed:
+                return False  # A straggling download after shutdown
+            row = self._conn.execute("SELECT size, path FROM content WHERE sha256 = ?", (sha256,)).fetchone()
+        original = row[1] if row is not None and os.path.abspath(row[1]) != os.path.abspath(path) else None
+        original_present = original is not None and self._present(original, size)
+        linked = original_present and link_file(original, path, self.link_mode)
+        with self._lock:
+            if self._closed:
+                return linked
+            with self._conn:
+                if not original_present:
+                    # First copy of this content (or the earlier one is gone): this file holds it now
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO content (sha256, size, path) VALUES (?, ?, ?)", (sha256, size, path)
+                    )
+                self._conn.execute("INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)", (url, sha256))
+        return linked
+
+    def moved(self, old_path: str, new_path: str):
+        """A stored file was renamed."""
+        with self._lock:
+            if self._closed:
+                return
+            with self._conn:
+                self._conn.execute("UPDATE content SET path = ? WHERE path = ?", (new_path, old_path))
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._conn.close()
@@ -0,0 +1,268 @@
+"""
+Live metrics for JFFScraper.
+Counters, histograms and gauges exported as Prometheus text over a local HTTP endpoint
+and/or as a JSON file rewritten at a fixed interval, for monitoring long runs.
+"""
+
+import bisect
+import http.server
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Throughput buckets in bytes per second (64 KB/s - 256 MB/s)
+THROUGHPUT_BUCKETS = tuple(float(64 << 10 << (2 * i)) for i in range(7))
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: above every bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Thread-safe metric registry. Metrics are declared once with define() and updated with
+    inc() (counters) and observe() (histograms), each with optional labels. Gauges are
+    callbacks read at export time, returning a number - or {label value: number} when the
+    gauge is defined with a label name.
+
+        metrics = Metrics("jffscraper")
+        metrics.define("pages_fetched_total", "counter", "Feed pages fetched")
+        metrics.inc("pages_fetched_total")
+    """
+
+    KINDS = ("counter", "histogram", "gauge")
+
+    def __init__(self, namespace: str = ""):
+        self.namespace = namespace
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._defs: dict[str, tuple[str, str, Optional[tuple]]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, _Histogram]] = {}
+        self._gauges: dict[str, Callable] = {}
+        self._gauge_labels: dict[str, Optional[str]] = {}
+
+    def define(self, name: str, kind: str, help_text: str, buckets: Optional[tuple] = None,
+               callback: Optional[Callable] = None, label: Optional[str] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown metric kind: {kind}")
+        with self._lock:
+            self._defs[name] = (kind, help_text, tuple(buckets or LATENCY_BUCKETS) if kind == "histogram" else None)
+            if kind == "counter":
+                self._counters.setdefault(name, {})
+            elif kind == "histogram":
+                self._histograms.setdefault(name, {})
+            else:
+                self._gauges[name] = callback
+                self._gauge_labels[name] = label
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.get(name)
+            if series is not None:
+                series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.get(name)
+            if series is None:
+                return
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._defs[name][2])
+            histogram.observe(value)
+
+    def _gauge_values(self, name: str) -> dict[tuple, float]:
+        label = self._gauge_labels.get(name)
+        try:
+            value = self._gauges[name]()
+        except Exception:
+            return {}
+        if label:
+            return {((label, key),): v for key, v in value.items()}
+        return {(): value}
+
+    # --- Export ---
+
+    def _full_name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            defs = dict(self._defs)
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+        lines = []
+        for name, (kind, help_text, _) in defs.items():
+            full = self._full_name(name)
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            if kind == "counter":
+                for key, value in counters[name].items():
+                    lines.append(f"{full}{_format_labels(key)} {_format_value(value)}")
+            elif kind == "gauge":
+                for key, value in self._gauge_values(name).items():
+                    lines.append(f"{full}{_format_labels(key)} {_format_value(value)}")
+            else:
+                for key, (counts, total, count, buckets) in histograms[name].items():
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                        cumulative += bucket_count
+                        le = ("le", _format_value(bound))
+                        lines.append(f"{full}_bucket{_format_labels(key, le)} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {_format_value(total)}")
+                    lines.append(f"{full}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """All metrics as plain data: counters and gauges by label set, histograms summarized."""
+        with self._lock:
+            defs = dict(self._defs)
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (h.sum, h.count, self._quantiles(h)) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        def label_str(key: tuple) -> str:
+            return ",".join(f"{name}={value}" for name, value in key)
+
+        data = {"timestamp": time.time(), "uptime_seconds": time.time() - self.started, "metrics": {}}
+        for name, (kind, _, _) in defs.items():
+            if kind == "counter":
+                values = {label_str(key): value for key, value in counters[name].items()}
+            elif kind == "gauge":
+                values = {label_str(key): value for key, value in self._gauge_values(name).items()}
+            else:
+                values = {
+                    label_str(key): {
+                        "count": count, "sum": total, "avg": total / count if count else None, **quantiles,
+                    }
+                    for key, (total, count, quantiles) in histograms[name].items()
+                }
+            data["metrics"][self._full_name(name)] = values
+        return data
+
+    @staticmethod
+    def _quantiles(histogram: _Histogram) -> dict:
+        """Upper bucket bounds of p50/p90/p99 (None above the largest bucket)."""
+        result = {}
+        for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            target = q * histogram.count
+            cumulative = 0
+            result[label] = None
+            for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                cumulative += bucket_count
+                if histogram.count and cumulative >= target:
+                    result[label] = bound
+                    break
+        return result
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    metrics: Metrics = None
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path in ("/", "/metrics"):
+            body = self.metrics.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.metrics.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would otherwise print over the progress display
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json on a background thread."""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1"):
+        handler = type("MetricsHandler", (_Handler,), {"metrics": metrics})
+        self._server = http.server.ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MetricsFileWriter:
+    """Rewrites a JSON snapshot of the metrics every `interval` seconds (atomically), and once more on stop()."""
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = max(interval, 0.5)
+        self._stop = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.metrics.snapshot(), f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Warning: Could not write metrics file {self.path}: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
@@ -0,0 +1,105 @@
+"""
+On-disk page cache for JFFScraper.
+Stores feed page responses compressed (zstd when the zstandard package is installed,
+zlib otherwise), one file per (feed, offset), for re-runs and offline replay.
+"""
+
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_READ_ERRORS = (OSError, ValueError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+class PageCache:
+    """
+    Thread-safe page cache rooted at `folder`. Pages are stored as
+    <folder>/<feed>/<offset>.html.zst (or .html.zz for zlib) and written atomically.
+    Either format is read back regardless of the codec currently in use.
+
+    ttl is the age in seconds after which get() ignores a page (0 = never expires);
+    get(..., max_age=None) in replay mode ignores the TTL altogether.
+    """
+
+    EXTENSIONS = {'zstd': ".html.zst", 'zlib': ".html.zz"}
+
+    def __init__(self, folder: str, ttl: float = 3600, codec: str = "auto", level: int = 6):
+        if codec == "auto":
+            codec = "zstd" if zstandard else "zlib"
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("Page cache codec 'zstd' needs the zstandard package (pip install zstandard)")
+        if codec not in self.EXTENSIONS:
+            raise ValueError(f"Unknown page cache codec: {codec}")
+        self.folder = folder
+        self.ttl = ttl
+        self.codec = codec
+        self.level = level
+        self._local = threading.local()  # zstd (de)compressors are not thread-safe
+
+    @staticmethod
+    def _feed_dir_name(feed: str) -> str:
+        return re.sub(r"[^\w.-]", "_", feed) or "_"
+
+    def _path(self, feed: str, offset: int, codec: str) -> str:
+        return os.path.join(self.folder, self._feed_dir_name(feed), f"{offset:08d}{self.EXTENSIONS[codec]}")
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            if not hasattr(self._local, 'compressor'):
+                self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+            return self._local.compressor.compress(data)
+        return zlib.compress(data, self.level)
+
+    def _decompress(self, data: bytes, codec: str) -> bytes:
+        if codec == "zstd":
+            if not hasattr(self._local, 'decompressor'):
+                self._local.decompressor = zstandard.ZstdDecompressor()
+            return self._local.decompressor.decompress(data)
+        return zlib.decompress(data)
+
+    def get(self, feed: str, offset: int, max_age: Optional[float] = -1) -> Optional[str]:
+        """
+        Cached page text, or None if missing or older than max_age seconds.
+        max_age -1 (default) uses the cache TTL; None accepts any age.
+        """
+        if max_age == -1:
+            max_age = self.ttl or None
+        for codec in self.EXTENSIONS:
+            if codec == "zstd" and zstandard is None:
+                continue
+            path = self._path(feed, offset, codec)
+            try:
+                if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                return self._decompress(data, codec).decode("utf-8")
+            except FileNotFoundError:
+                continue
+            except _READ_ERRORS as e:
+                print(f"Warning: Ignoring unreadable cached page {path}: {e}")
+        return None
+
+    def put(self, feed: str, offset: int, html_text: str):
+        """Store a page, replacing any cached copy."""
+        path = self._path(feed, offset, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._compress(html_text.encode("utf-8")))
+        os.replace(tmp_path, path)
+        # Drop a copy in the other format so get() can't return a stale one
+        for codec in self.EXTENSIONS:
+            if codec != self.codec:
+                try:
+                    os.remove(self._path(feed, offset, codec))
+                except FileNotFoundError:
+                    pass
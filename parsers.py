@@ -0,0 +1,185 @@
+"""
+HTML parser backends for JFFScraper.
+Locates post cards in a getPosts.php response and exposes them through a small
+common Card interface, so Post extraction is independent of the parser used.
+"""
+
+import abc
+from typing import Optional
+
+import bs4
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401 - only needed as a BeautifulSoup tree builder
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+
+CARD_SELECTOR = "div.mbsc-card.jffPostClass"
+
+# Text inside these elements is not part of an element's visible text (matches BeautifulSoup's get_text)
+_NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+def _has_card_class(value) -> bool:
+    """SoupStrainer class test. Depending on the bs4 version the value is the raw attribute string or a list."""
+    if not value:
+        return False
+    if isinstance(value, str):
+        value = value.split()
+    return "jffPostClass" in value
+
+
+class Card(abc.ABC):
+    """
+    A post card (or any element inside one). Backends implement:
+        classes: list of CSS classes
+        attr(name, default): attribute value ('' for valueless attributes)
+        select(css) / select_one(css): descendant lookups returning Cards
+        text: concatenated text content
+        html: serialized markup of the element
+    """
+
+    @property
+    @abc.abstractmethod
+    def classes(self) -> list[str]: ...
+
+    @property
+    @abc.abstractmethod
+    def text(self) -> str: ...
+
+    @property
+    @abc.abstractmethod
+    def html(self) -> str: ...
+
+    @abc.abstractmethod
+    def attr(self, name: str, default=None): ...
+
+    @abc.abstractmethod
+    def select(self, css: str) -> list['Card']: ...
+
+    def select_one(self, css: str) -> Optional['Card']:
+        found = self.select(css)
+        return found[0] if found else None
+
+
+class SoupCard(Card):
+    """Card backed by a BeautifulSoup Tag."""
+
+    def __init__(self, tag: bs4.Tag):
+        self._tag = tag
+
+    @property
+    def classes(self) -> list[str]:
+        return self._tag.get("class") or []
+
+    @property
+    def text(self) -> str:
+        return self._tag.text
+
+    @property
+    def html(self) -> str:
+        return str(self._tag)
+
+    def attr(self, name: str, default=None):
+        return self._tag.get(name, default)
+
+    def select(self, css: str) -> list[Card]:
+        return [SoupCard(t) for t in self._tag.select(css)]
+
+    def select_one(self, css: str) -> Optional[Card]:
+        tag = self._tag.select_one(css)
+        return SoupCard(tag) if tag is not None else None
+
+
+class LexborCard(Card):
+    """Card backed by a selectolax (lexbor) node."""
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def classes(self) -> list[str]:
+        return (self._node.attributes.get("class") or "").split()
+
+    @property
+    def text(self) -> str:
+        return "".join(
+            n.text_content for n in self._node.traverse(include_text=True)
+            if n.tag == "-text" and n.parent.tag not in _NON_TEXT_TAGS
+        )
+
+    @property
+    def html(self) -> str:
+        return self._node.html
+
+    def attr(self, name: str, default=None):
+        attributes = self._node.attributes
+        if name not in attributes:
+            return default
+        value = attributes[name]
+        return "" if value is None else value
+
+    def select(self, css: str) -> list[Card]:
+        return [LexborCard(n) for n in self._node.css(css)]
+
+    def select_one(self, css: str) -> Optional[Card]:
+        node = self._node.css_first(css)
+        return LexborCard(node) if node is not None else None
+
+
+class SoupParser:
+    """BeautifulSoup backend. Only the post card subtrees are materialized."""
+
+    def __init__(self, builder: str = "html.parser"):
+        self.name = builder
+        self._builder = builder
+
+    def parse_cards(self, html_text: str) -> list[Card]:
+        strainer = bs4.SoupStrainer("div", attrs={"class": _has_card_class})
+        soup = bs4.BeautifulSoup(html_text, self._builder, parse_only=strainer)
+        return [SoupCard(tag) for tag in soup.select(CARD_SELECTOR)]
+
+
+class LexborParser:
+    """selectolax/lexbor backend."""
+
+    name = "selectolax"
+
+    def parse_cards(self, html_text: str) -> list[Card]:
+        tree = LexborHTMLParser(html_text)
+        return [LexborCard(node) for node in tree.css(CARD_SELECTOR)]
+
+
+def available_backends() -> list[str]:
+    """Names of the backends usable in this environment, fastest first."""
+    names = []
+    if LexborHTMLParser is not None:
+        names.append("selectolax")
+    if _HAS_LXML:
+        names.append("lxml")
+    names.append("html.parser")
+    return names
+
+
+def get_parser(name: str = "auto"):
+    """
+    Get a parser backend by name: 'selectolax', 'lxml', 'html.parser' or 'auto'
+    (fastest installed). Falls back to html.parser if the requested one is unavailable.
+    """
+    name = (name or "auto").strip().lower()
+    available = available_backends()
+    if name == "auto":
+        name = available[0]
+    elif name not in available:
+        name = "html.parser"
+
+    if name == "selectolax":
+        return LexborParser()
+    return SoupParser(name)
@@ -0,0 +1,123 @@
+"""
+Post filters for JFFScraper.
+Selects posts by date window, type, tags and access level right after they are parsed,
+and tells the crawler when a feed has paged past the start of the date window.
+"""
+
+import datetime
+from typing import Iterable, Optional
+
+
+def _names(values: Iterable[str]) -> frozenset:
+    return frozenset(value.strip().lstrip("#").lower() for value in values if value.strip().lstrip("#"))
+
+
+def parse_date(value: str) -> Optional[datetime.date]:
+    """A YYYY-MM-DD date, or None for a blank value. Raises ValueError."""
+    value = value.strip()
+    return datetime.date.fromisoformat(value) if value else None
+
+
+class PostFilter:
+    """
+    Which posts to keep. Every criterion left empty matches everything.
+
+    date_from / date_to bound the post's date (inclusive) on date_field ("post" uses
+    post_date_iso, "upload" upload_date_iso); a post without a usable date is outside any
+    window. types, access and tags are case-insensitive; a post needs one of tags (if any)
+    and none of exclude_tags.
+    """
+
+    def __init__(
+        self,
+        date_from: Optional[datetime.date] = None,
+        date_to: Optional[datetime.date] = None,
+        date_field: str = "post",
+        types: Iterable[str] = (),
+        tags: Iterable[str] = (),
+        exclude_tags: Iterable[str] = (),
+        access: Iterable[str] = (),
+    ):
+        if date_field not in ("post", "upload"):
+            raise ValueError(f"Unknown date field: {date_field} (expected post or upload)")
+        if date_from and date_to and date_from > date_to:
+            raise ValueError(f"Date window starts ({date_from}) after it ends ({date_to})")
+        self.date_from = date_from
+        self.date_to = date_to
+        self.date_field = date_field
+        self.types = _names(types)
+        self.tags = _names(tags)
+        self.exclude_tags = _names(exclude_tags)
+        self.access = _names(access)
+
+    @property
+    def active(self) -> bool:
+        return bool(
+            self.date_from or self.date_to or self.types or self.tags or self.exclude_tags or self.access
+        )
+
+    @property
+    def follows_feed_order(self) -> bool:
+        """
+        True when the window is on the post date, the order the feed is in. Upload dates
+        aren't monotone along the feed, so an upload-date window can't stop or skip pages.
+        """
+        return self.date_field == "post"
+
+    def post_date(self, post) -> Optional[datetime.date]:
+        """The date the window applies to, or None if the post has none."""
+        value = post.post_date_iso if self.date_field == "post" else post.upload_date_iso
+        try:
+            return datetime.datetime.fromisoformat(value).date()
+        except (TypeError, ValueError):
+            return None
+
+    def matches(self, post) -> bool:
+        if self.date_from or self.date_to:
+            date = self.post_date(post)
+            if date is None:
+                return False
+            if (self.date_from and date < self.date_from) or (self.date_to and date > self.date_to):
+                return False
+        if self.types and (post.type or "").lower() not in self.types:
+            return False
+        if self.access and (post.access_control or "").lower() not in self.access:
+            return False
+        if self.tags or self.exclude_tags:
+            tags = _names(post.tags or ())
+            if self.tags and not tags & self.tags:
+                return False
+            if tags & self.exclude_tags:
+                return False
+        return True
+
+    def before_window(self, post) -> bool:
+        """
+        True for a post older than date_from. The feed is newest by post date first, so once
+        a non-pinned post is, every later page is too (always False for an upload-date window).
+        """
+        if not self.date_from or not self.follows_feed_order:
+            return False
+        date = self.post_date(post)
+        return date is not None and date < self.date_from
+
+    def after_window(self, post) -> bool:
+        """True for a post newer than date_to."""
+        if not self.date_to:
+            return False
+        date = self.post_date(post)
+        return date is not None and date > self.date_to
+
+    def describe(self) -> str:
+        parts = []
+        if self.date_from or self.date_to:
+            parts.append(f"{self.date_field} date {self.date_from or 'any'} to {self.date_to or 'any'}")
+        if self.types:
+            parts.append("types " + ", ".join(sorted(self.types)))
+        if self.tags:
+            parts.append("tags " + ", ".join(sorted(self.tags)))
+        if self.exclude_tags:
+            parts.append("without tags " + ", ".join(sorted(self.exclude_tags)))
+        if self.access:
+            parts.append("access " + ", ".join(sorted(self.access)))
+        return "; ".join(parts)
@@ -0,0 +1,100 @@
+"""
+Profiling support for JFFScraper (--profile).
+Runs cProfile in every thread and merges the results into one stats file, and sums
+wall time per pipeline stage across threads for a quick breakdown table.
+"""
+
+import cProfile
+import pstats
+import sys
+import threading
+import time
+from typing import Optional
+
+
+class StageTimer:
+    """Thread-safe wall time totals per stage: calls, total seconds and the longest call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, list] = {}  # stage -> [calls, total, max]
+        self.started = time.monotonic()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            totals = self._stages.get(stage)
+            if totals is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                totals[0] += 1
+                totals[1] += seconds
+                totals[2] = max(totals[2], seconds)
+
+    def rows(self) -> list[tuple[str, int, float, float]]:
+        """(stage, calls, total seconds, max seconds), most total time first."""
+        with self._lock:
+            rows = [(stage, calls, total, longest) for stage, (calls, total, longest) in self._stages.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def table(self) -> list[str]:
+        """The breakdown as aligned text lines. Stage time is summed over threads, so shares can exceed 100%."""
+        wall = time.monotonic() - self.started
+        lines = [f"{'Stage':<28} {'Calls':>7} {'Total s':>9} {'Avg ms':>9} {'Max ms':>9} {'% of wall':>10}"]
+        for stage, calls, total, longest in self.rows():
+            lines.append(
+                f"{stage:<28} {calls:>7} {total:>9.2f} {total / calls * 1000:>9.1f} "
+                f"{longest * 1000:>9.1f} {total / wall:>10.0%}"
+            )
+        lines.append(f"{'(run wall time)':<28} {'':>7} {wall:>9.2f}")
+        return lines
+
+
+class ThreadProfiler:
+    """
+    cProfile for the whole process. Python < 3.12 profiles per thread, so every thread
+    started after start() gets its own profiler (via threading.setprofile); from 3.12 one
+    profiler sees all threads. stop() merges everything into a single pstats file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: list[cProfile.Profile] = []
+        self._per_thread = sys.version_info < (3, 12)
+
+    def _new_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def _thread_hook(self, frame, event, arg):
+        # First event in a new thread: hand the thread over to its own cProfile,
+        # which replaces this hook for the thread
+        self._new_profile()
+
+    def start(self):
+        if self._per_thread:
+            threading.setprofile(self._thread_hook)
+        self._new_profile()
+
+    def stop(self, path: str) -> Optional[pstats.Stats]:
+        """Stop profiling and write the merged stats to path. Threads still running stay profiled until they exit."""
+        if self._per_thread:
+            threading.setprofile(None)
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            profile.disable()
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                continue  # A thread that never ran any profiled code
+        if stats is not None:
+            stats.dump_stats(path)
+        return stats
@@ -0,0 +1,188 @@
+"""
+Request rate limiting and retry policy for JFFScraper.
+Token buckets pace outbound requests and BandwidthLimiter caps the bytes downloaded;
+RetryPolicy decides which failures are retried and how long to wait (jittered exponential
+backoff, honouring Retry-After).
+"""
+
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+
+# Statuses worth retrying: throttling and transient server/gateway errors
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: on average `rate` requests per second, with bursts of up to
+    `burst`. A rate of 0 disables limiting. reserve() hands out the time a caller must wait,
+    so the same bucket serves threads (wait) and coroutines (asyncio.sleep(reserve())).
+    """
+
+    def __init__(self, rate: float = 0.0, burst: int = 1):
+        self.rate = max(rate, 0.0)
+        self.burst = max(burst, 1)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            pause = max(self._paused_until - now, 0.0)
+            if not self.rate:
+                return pause
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance is a queue of callers each waiting for its token to refill
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, pause)
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Hold every request on this bucket for the given time (e.g. after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def parse_schedule(text: str) -> list[tuple[int, int, float]]:
+    """
+    Parse time-of-day rates like "09:00-18:00=2, 22:00-06:00=0" into (start minute,
+    end minute, rate) entries. Ranges may wrap past midnight. Raises ValueError.
+    """
+    entries = []
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        span, sep, rate = item.partition("=")
+        start, dash, end = span.strip().partition("-")
+        if not sep or not dash:
+            raise ValueError(f"Bad schedule entry {item!r}, expected HH:MM-HH:MM=rate")
+        minutes = []
+        for clock in (start, end):
+            hours, colon, mins = clock.strip().partition(":")
+            if not colon or not (0 <= int(hours) <= 24 and 0 <= int(mins) < 60):
+                raise ValueError(f"Bad time {clock.strip()!r} in schedule entry {item!r}")
+            minutes.append(int(hours) * 60 + int(mins))
+        entries.append((minutes[0], minutes[1], max(float(rate), 0.0)))
+    return entries
+
+
+class BandwidthLimiter:
+    """
+    Thread-safe cap on the bytes downloaded per second, shared by every download. rate is
+    in bytes per second (0 = unlimited); schedule entries from parse_schedule override it
+    at their times of day (local time), the first match winning.
+
+    Callers report each chunk after receiving it under a lane (e.g. a media type) and wait
+    the returned time, like TokenBucket.reserve(). lanes lists them most important first:
+    while a lane is downloading, every lane after it is held to background_share of the
+    rate, so large low-priority transfers can't crowd out the rest.
+    """
+
+    ACTIVE_SECONDS = 1.0  # A lane counts as downloading this long after its last chunk
+    BURST_SECONDS = 1.0   # Bytes that may arrive at once, in seconds of the rate
+
+    def __init__(self, rate: float = 0.0, schedule: list[tuple[int, int, float]] = (),
+                 lanes: tuple = (), background_share: float = 0.2):
+        self.base_rate = max(rate, 0.0)
+        self.schedule = list(schedule)
+        self.lanes = tuple(lanes)
+        self.background_share = min(max(background_share, 0.01), 1.0)
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._last_active: dict[str, float] = {}
+        self._lane_next: dict[str, float] = {}  # Earliest time an outranked lane may continue
+
+    def current_rate(self) -> float:
+        """Bytes per second allowed now (0 = unlimited)."""
+        if self.schedule:
+            now = time.localtime()
+            minute = now.tm_hour * 60 + now.tm_min
+            for start, end, rate in self.schedule:
+                if (start <= minute < end) if start <= end else (minute >= start or minute < end):
+                    return rate
+        return self.base_rate
+
+    def _outranked(self, lane: str, now: float) -> bool:
+        if lane not in self.lanes:
+            return False
+        for other in self.lanes[:self.lanes.index(lane)]:
+            if now - self._last_active.get(other, float("-inf")) < self.ACTIVE_SECONDS:
+                return True
+        return False
+
+    def reserve(self, nbytes: int, lane: str = "") -> float:
+        """Account for nbytes just received on lane; returns how many seconds to wait."""
+        rate = self.current_rate()
+        with self._lock:
+            now = time.monotonic()
+            self._last_active[lane] = now
+            if not rate:
+                self._tokens = 0.0
+                self._updated = now
+                return 0.0
+            burst = rate * self.BURST_SECONDS
+            self._tokens = min(burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= nbytes
+            wait = -self._tokens / rate if self._tokens < 0 else 0.0
+            if self._outranked(lane, now):
+                lane_next = max(now, self._lane_next.get(lane, 0.0)) + nbytes / (rate * self.background_share)
+                self._lane_next[lane] = lane_next
+                wait = max(wait, lane_next - now)
+            return wait
+
+    def consume(self, nbytes: int, lane: str = ""):
+        delay = self.reserve(nbytes, lane)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RetryPolicy:
+    """Retry attempts and jittered exponential backoff ("full jitter") between them."""
+
+    def __init__(self, retries: int = 5, base: float = 1.0, cap: float = 60.0):
+        self.retries = max(retries, 0)
+        self.base = base
+        self.cap = cap
+
+    @staticmethod
+    def retryable(status: int) -> bool:
+        return status in RETRY_STATUSES
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number attempt + 1. Retry-After wins when longer."""
+        backoff = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        if retry_after is not None:
+            return max(min(retry_after, self.cap * 5), backoff)
+        return backoff
@@ -0,0 +1,206 @@
+"""
+direct_download against a local Range-capable server: segmenting, resuming a .tmp (also
+after the downloading process is killed mid-segment) and 416 handling.
+
+Usage: python -m pytest tests
+"""
+
+import hashlib
+import http.server
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("curl_cffi")
+
+import direct_download  # noqa: E402
+from http_client import ClientPool  # noqa: E402
+from rate_limit import RetryPolicy  # noqa: E402
+
+
+SIZE = 6 << 20
+SEGMENT_THRESHOLD = 1 << 20
+DATA = b"".join(hashlib.sha256(str(i).encode()).digest() for i in range(SIZE // 32))
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: 'RangeServer'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        for i in range(0, len(body), 16 << 10):
+            self.wfile.write(body[i:i + (16 << 10)])
+            self.server.count(len(body[i:i + (16 << 10)]))
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+
+    def do_GET(self):
+        data = self.server.data
+        self.server.ranges.append(self.headers.get("Range"))
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if not match:
+            self._send(200, data)
+            return
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+        if start >= len(data):
+            self._send(416, b"", {"Content-Range": f"bytes */{len(data)}"})
+            return
+        if start and self.server.fail_once.pop(start, False):
+            self._send(503, b"<html>Service Unavailable</html>" * 100, {"Retry-After": "0"})
+            return
+        self._send(206, data[start:end + 1], {"Content-Range": f"bytes {start}-{end}/{len(data)}"})
+
+
+class RangeServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data: bytes, chunk_delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.data = data
+        self.chunk_delay = chunk_delay
+        self.fail_once: dict[int, bool] = {}
+        self.ranges: list = []
+        self.sent = 0
+        self._lock = threading.Lock()
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/photo.jpg"
+
+    def count(self, n: int):
+        with self._lock:
+            self.sent += n
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(data: bytes = DATA, chunk_delay: float = 0.0) -> RangeServer:
+        srv = RangeServer(data, chunk_delay)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return srv
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _pool() -> ClientPool:
+    return ClientPool(site_hosts=(), http2=False, retry=RetryPolicy(retries=3, base=0.01))
+
+
+def _download(url: str, path: str):
+    return direct_download.download(_pool(), url, path, segment_threshold=SEGMENT_THRESHOLD, max_segments=4)
+
+
+def _check(path: str, result):
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert result == (SIZE, hashlib.sha256(DATA).hexdigest())
+    assert not os.path.exists(path + ".tmp")
+    assert not os.path.exists(path + ".tmp.parts")
+
+
+def test_segmented_download(server, tmp_path):
+    srv = server()
+    path = str(tmp_path / "photo.jpg")
+    _check(path, _download(srv.url, path))
+    # The first window, then the rest as parallel ranges
+    assert srv.ranges[0] == f"bytes=0-{SEGMENT_THRESHOLD - 1}"
+    assert len(srv.ranges) == 5
+    assert srv.sent == SIZE
+
+
+def test_failed_segment_does_not_touch_neighbours(server, tmp_path):
+    srv = server()
+    srv.fail_once = {SEGMENT_THRESHOLD + (SIZE - SEGMENT_THRESHOLD) // 4: True}
+    path = str(tmp_path / "photo.jpg")
+    _check(path, _download(srv.url, path))
+
+
+def test_resume_partial_tmp(server, tmp_path):
+    srv = server()
+    path = str(tmp_path / "photo.jpg")
+    with open(path + ".tmp", "wb") as f:
+        f.write(DATA[:1536 << 10])
+    _check(path, _download(srv.url, path))
+    assert srv.ranges[0] == f"bytes={1536 << 10}-{(1536 << 10) + SEGMENT_THRESHOLD - 1}"
+    assert srv.sent == SIZE - (1536 << 10)
+
+
+def test_416_complete_tmp(server, tmp_path):
+    srv = server()
+    path = str(tmp_path / "photo.jpg")
+    with open(path + ".tmp", "wb") as f:
+        f.write(DATA)
+    _check(path, _download(srv.url, path))
+    assert srv.sent == 0
+
+
+def test_416_oversized_tmp_restarts(server, tmp_path):
+    srv = server()
+    path = str(tmp_path / "photo.jpg")
+    with open(path + ".tmp", "wb") as f:
+        f.write(DATA + b"stale")
+    _check(path, _download(srv.url, path))
+    assert srv.sent == SIZE
+
+
+def test_resume_after_kill_mid_segment(server, tmp_path):
+    """A download killed while its segments run resumes to a byte-exact file."""
+    srv = server(chunk_delay=0.005)
+    path = str(tmp_path / "photo.jpg")
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {ROOT!r})
+        import direct_download
+        from http_client import ClientPool
+        direct_download.STATE_SAVE_INTERVAL = 128 << 10
+        direct_download.download(ClientPool(site_hosts=(), http2=False), {srv.url!r}, {path!r},
+                                 segment_threshold={SEGMENT_THRESHOLD}, max_segments=4)
+    """)
+    process = subprocess.Popen([sys.executable, "-c", script])
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                with open(path + ".tmp.parts", encoding="utf-8") as f:
+                    segments = json.load(f)["segments"]
+            except (OSError, ValueError):
+                segments = []
+            if sum(done for _, _, done in segments) >= 512 << 10:
+                break
+            assert process.poll() is None, "download finished before it could be killed"
+            time.sleep(0.01)
+        else:
+            pytest.fail("no segment progress recorded")
+    finally:
+        process.send_signal(signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+        process.wait()
+
+    assert not os.path.exists(path)
+    killed_at = srv.sent
+    srv.chunk_delay = 0.0
+    _check(path, _download(srv.url, path))
+    # Recorded segment progress was kept, not fetched again
+    assert srv.sent - killed_at < SIZE - SEGMENT_THRESHOLD
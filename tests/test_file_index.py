@@ -0,0 +1,96 @@
+"""
+FileIndex lookups must answer exactly what the glob patterns they replace would find.
+
+Usage: python -m pytest tests
+"""
+
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_index import FileIndex  # noqa: E402
+
+
+NAMES = [
+    # Empty description: the basename ends with " - PID -"
+    "alice - 2024-01-02 - P100 -.mp4",
+    "alice - 2024-01-02 - P101 -.ytdl",
+    # Ordinary and multi-" - " descriptions
+    "alice - 2024-01-03 - P200 - hello world.mp4",
+    "alice - 2024-01-04 - P300 - part one - part two - end.mp4",
+    "alice - 2024-01-04 - P301 - a - b -.mp4.ytdl",
+    # Description truncated at 140 bytes
+    "alice - 2024-01-05 - P400 - a long description that was cut off...mp4",
+    "alice - 2024-01-05 - P401 - trailing dash -...mp4",
+    # Photos and text next to the videos
+    "alice - 2024-01-06 - P500 - gallery.00.jpg",
+    "alice - 2024-01-06 - P500 - gallery.01.jpg",
+    "alice - 2024-01-07 - P600 -.txt",
+    # Names the pid glob must not match
+    "alice - 2024-01-08 - P700.mp4",
+    "P800 - 2024-01-08.mp4",
+    ".hidden - 2024-01-09 - P900 -.mp4",
+]
+
+EXTS = [".mp4", ".ytdl", ".jpg", ".txt"]
+
+
+def _tokens(names):
+    """Candidate pids: every " - "-separated piece and some that never occur."""
+    tokens = {"", "P999", "2024-01-02", "a", "b", "part one"}
+    for name in names:
+        stem = os.path.splitext(name)[0]
+        tokens.update(stem.split(" - "))
+        tokens.update(part.rstrip(" -") for part in stem.split(" - "))
+    return sorted(tokens)
+
+
+def _make_folder(tmp_path):
+    for name in NAMES:
+        (tmp_path / name).write_bytes(b"")
+    return str(tmp_path)
+
+
+def _glob_pid(folder, pid, ext):
+    return sorted(glob.glob(os.path.join(glob.escape(folder), f"* - {glob.escape(pid)} -*{ext}")))
+
+
+def test_find_pid_matches_glob(tmp_path):
+    folder = _make_folder(tmp_path)
+    index = FileIndex(folder)
+    for pid in _tokens(NAMES):
+        for ext in EXTS:
+            matches = _glob_pid(folder, pid, ext)
+            assert index.find_pid(pid, ext) == (matches[0] if matches else None), (pid, ext)
+
+
+def test_find_pid_empty_description(tmp_path):
+    index = FileIndex(_make_folder(tmp_path))
+    assert index.find_pid("P100", ".mp4") is not None
+    assert index.find_pid("P101", ".ytdl") is not None
+    assert index.find_pid("P301", ".ytdl") is not None
+
+
+def test_find_matches_glob(tmp_path):
+    folder = _make_folder(tmp_path)
+    index = FileIndex(folder)
+    for name in NAMES:
+        prefix = name[:FileIndex.PREFIX_LEN]
+        for suffix in [".mp4", ".txt", ".00.jpg", ".01.jpg", ".02.jpg"]:
+            matches = sorted(glob.glob(os.path.join(glob.escape(folder), f"{glob.escape(prefix)}*{suffix}")))
+            assert index.find(prefix, suffix) == (matches[0] if matches else None), (prefix, suffix)
+
+
+def test_add_and_discard_follow_glob(tmp_path):
+    folder = _make_folder(tmp_path)
+    index = FileIndex(folder)
+    path = os.path.join(folder, "alice - 2024-02-01 - P1000 -.mp4")
+    open(path, "wb").close()
+    index.add(path)
+    assert index.find_pid("P1000", ".mp4") == _glob_pid(folder, "P1000", ".mp4")[0]
+    os.remove(path)
+    index.discard(path)
+    assert index.find_pid("P1000", ".mp4") is None
+    assert _glob_pid(folder, "P1000", ".mp4") == []
@@ -0,0 +1,48 @@
+"""
+Every installed HTML parser backend must parse the golden corpus (benchmarks/corpus) to the
+expected Post fields, so html_parser = auto can't switch to a backend that diverges.
+Regenerate the expected fields with: python benchmarks/bench_parser.py --update
+
+Usage: python -m pytest tests
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("bs4")
+pytest.importorskip("curl_cffi")
+
+import bench_parser  # noqa: E402  (sets TZ=UTC, which the expected dates are in)
+from bench_parser import FIELDS, parse_page, post_fields  # noqa: E402
+from parsers import available_backends, get_parser  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    bench_parser.app.config.read(os.path.join(ROOT, "config.ini"))
+    with open(bench_parser.PAGE_PATH, "r", encoding="utf-8") as f:
+        html_text = f.read()
+    with open(bench_parser.EXPECTED_PATH, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    return html_text, expected
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backend_matches_golden_corpus(backend, corpus):
+    html_text, expected = corpus
+    actual = [post_fields(post) for post in parse_page(get_parser(backend), html_text)]
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        for field in FIELDS:
+            assert got[field] == want.get(field), (backend, want.get("pid"), field)
+
+
+def test_auto_picks_an_installed_backend():
+    assert get_parser("auto").name == available_backends()[0]